@@ -0,0 +1,192 @@
+"""Compares model encodings and measures how the model scales.
+
+    python benchmark.py [--time-limit SECONDS] [--seeds N] [--workers N]
+    python benchmark.py --employees 5,25,100,200 --months 1,3,6 [--vacation SHARE] [--pref-free SHARE] [--results FILE]
+    python benchmark.py --employees 50 --months 3 --generate DIR
+
+Without --employees, builds the template employee.csv and config.ini of
+scheduler.py in a temporary directory and solves it once per encoding and
+seed. With --employees, generates a synthetic roster for every number of
+employees and months instead. Every case runs in a fresh process, so its
+peak memory can be measured; --results appends the rows to a CSV file to
+compare runs of different versions.
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import csv
+import datetime
+import os
+import random
+import tempfile
+
+import scheduler
+from employees import EmployeeTable
+from feasibility import InfeasibleInput
+from metrics import modelSize
+
+# encodings of the night sequence rules, see scheduler.addSequenceRules
+sequenceEncodings = ['linear', 'table']
+
+resultColumns = ['version', 'date', 'scenario', 'employees', 'months', 'vacation', 'pref_free', 'encoding', 'seed',
+                 'workers', 'time_limit', 'variables', 'constraints', 'build', 'status', 'objective', 'bound',
+                 'wall_time', 'conflicts', 'peak_mb']
+
+
+def run(config, employees, params, months=1):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            schedule = scheduler.buildModel(config, employees, months)
+        except InfeasibleInput:
+            return {'variables': 0, 'constraints': 0, 'build': 0.0, 'status': 'INFEASIBLE_INPUT', 'objective': None,
+                    'bound': None, 'wall_time': 0.0, 'conflicts': 0}
+        solution = scheduler.solve(schedule, params)
+    stats = schedule.metrics.solver['response_stats']
+    variables, constraints = modelSize(schedule.model)
+    return {'variables': variables,
+            'constraints': constraints,
+            'build': round(sum(p['seconds'] for p in schedule.metrics.phases if p['phase'] != 'solve'), 6),
+            'status': solution.statusName,
+            'objective': solution.objective,
+            'bound': solution.bound,
+            'wall_time': round(solution.wallTime, 6),
+            'conflicts': stats.get('conflicts', 0)}
+
+
+def peakMemory():
+    """Peak resident memory of this process in MB, None where unknown (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def runCase(directory, months, encoding, params):
+    """Loads the scenario in directory and solves it, meant for a fresh process."""
+    config = scheduler.loadConfig(os.path.join(directory, scheduler.configFile))
+    config['General']['sequence_encoding'] = encoding
+    employees = EmployeeTable.load(os.path.join(directory, scheduler.employeeFile), scheduler.configuredMonth(config))
+    r = run(config, employees, params, months)
+    r['peak_mb'] = peakMemory()
+    return r
+
+
+def generateScenario(directory, employees, months=1, vacation=0.0, prefFree=0.0, seed=1):
+    """Writes a synthetic employee.csv and config.ini into directory.
+
+    Each of the employees gets one block of vacation of the vacation share
+    of the horizon and each other day is a preferred free day with chance
+    prefFree. The config is the template one, planning months months.
+    """
+    rng = random.Random(seed)
+    employeePath = os.path.join(directory, scheduler.employeeFile)
+    configPath = os.path.join(directory, scheduler.configFile)
+    scheduler.writeTemplates(employeePath, configPath)
+    config = scheduler.loadConfig(configPath)
+    days = scheduler.horizonDays(scheduler.configuredMonth(config), months)
+    names = ['E%03i' % (i + 1) for i in range(employees)]
+
+    with open(employeePath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "hours_per_week", "overtime", "available_for_shift", "not_replaced_by", "double_shift",
+                         "no_single_dayshift", "48_hour_shifts", "can_be_single", "prefFree", "vacation", "forced_shifts"])
+        for name in names:
+            length = round(vacation * days)
+            first = rng.randint(1, days - length + 1)
+            away = range(first, first + length)
+            pref = [d for d in range(1, days + 1) if d not in away and rng.random() < prefFree]
+            writer.writerow([name, rng.choice([20, 30, 40, 40]), rng.randint(0, 15),
+                             "d,wn,nhwk" if rng.random() < 0.1 else "n,d,wn,nhwk", "",
+                             "yes" if rng.random() < 0.8 else "no", "no", "no", "no",
+                             ",".join(str(d) for d in pref), ",".join(str(d) for d in away), ""])
+
+    config['General']['months'] = str(months)
+    config['General']['nightshift_last_month'] = names[0]
+    # preferred free days are wishes, not rules
+    config['General']['force_pref_free'] = 'False'
+    with open(configPath, 'w') as f:
+        config.write(f)
+
+
+def parseList(value, parse=int):
+    return [parse(v.strip()) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--time-limit', type=float, default=60.0, metavar='SECONDS')
+    parser.add_argument('--seeds', type=int, default=3, metavar='N')
+    parser.add_argument('--workers', type=int, default=1, metavar='N')
+    parser.add_argument('--employees', metavar='N,N,...',
+                        help='solve synthetic rosters of these numbers of employees instead of the template')
+    parser.add_argument('--months', default='1', metavar='N,N,...',
+                        help='horizons in months of the synthetic rosters (default 1)')
+    parser.add_argument('--vacation', type=float, default=0.1, metavar='SHARE',
+                        help='share of the horizon each synthetic employee is on vacation (default 0.1)')
+    parser.add_argument('--pref-free', dest='pref_free', type=float, default=0.05, metavar='SHARE',
+                        help='chance of each day to be a preferred free day (default 0.05)')
+    parser.add_argument('--scenario-seed', dest='scenario_seed', type=int, default=1, metavar='SEED',
+                        help='seed of the synthetic rosters (default 1)')
+    parser.add_argument('--encodings', metavar='ENCODING,...',
+                        help='sequence encodings to compare (default: all for the template, table for synthetic rosters)')
+    parser.add_argument('--results', metavar='FILE',
+                        help='append one row per case to this CSV file')
+    parser.add_argument('--generate', metavar='DIR',
+                        help='only write the synthetic rosters to DIR, one directory each (for scheduler.py --batch)')
+    args = parser.parse_args()
+
+    synthetic = args.employees is not None
+    if args.generate and not synthetic:
+        parser.error('--generate needs --employees')
+    encodings = parseList(args.encodings, str) if args.encodings else (['table'] if synthetic else sequenceEncodings)
+    cases = [(n, m) for n in parseList(args.employees) for m in parseList(args.months)] if synthetic else [(None, 1)]
+
+    if args.generate:
+        for (n, m) in cases:
+            directory = os.path.join(args.generate, 'e%i-m%i' % (n, m))
+            os.makedirs(directory, exist_ok=True)
+            generateScenario(directory, n, m, args.vacation, args.pref_free, args.scenario_seed)
+        print('%i scenarios written to %s' % (len(cases), args.generate))
+        return
+
+    rows = []
+    print('%-9s %6s %-8s %4s %7s %7s %8s %-16s %9s %9s %8s %9s %7s' % (
+        'employees', 'months', 'encoding', 'seed', 'vars', 'constr', 'build', 'status', 'objective', 'bound', 'time',
+        'conflicts', 'peak MB'))
+    with tempfile.TemporaryDirectory() as tmp:
+        for (n, m) in cases:
+            directory = os.path.join(tmp, 'e%s-m%i' % (n, m))
+            os.makedirs(directory)
+            if synthetic:
+                generateScenario(directory, n, m, args.vacation, args.pref_free, args.scenario_seed)
+            else:
+                scheduler.writeTemplates(os.path.join(directory, scheduler.employeeFile),
+                                         os.path.join(directory, scheduler.configFile))
+            for encoding in encodings:
+                for seed in range(1, args.seeds + 1):
+                    params = {'max_time_in_seconds': args.time_limit, 'num_workers': args.workers, 'random_seed': seed}
+                    # a fresh process per case, peak memory is per process
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+                        r = pool.submit(runCase, directory, m, encoding, params).result()
+                    print('%-9s %6i %-8s %4i %7i %7i %8.3f %-16s %9s %9s %8.2f %9i %7s' % (
+                        n or 'template', m, encoding, seed, r['variables'], r['constraints'], r['build'], r['status'],
+                        r['objective'], r['bound'], r['wall_time'], r['conflicts'], r['peak_mb']))
+                    rows.append(dict(r, version=scheduler.version, date=datetime.date.today().isoformat(),
+                                     scenario='synthetic' if synthetic else 'template', employees=n or '',
+                                     months=m, vacation=args.vacation if synthetic else '',
+                                     pref_free=args.pref_free if synthetic else '', encoding=encoding, seed=seed,
+                                     workers=args.workers, time_limit=args.time_limit))
+
+    if args.results:
+        exists = os.path.exists(args.results)
+        with open(args.results, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=resultColumns)
+            if not exists:
+                writer.writeheader()
+            writer.writerows(rows)
+        print('%i results appended to %s' % (len(rows), args.results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Per-day calendar of the planning horizon, built once per run."""
+import datetime
+import numpy as np
+
+# night shift starting on each weekday (Monday = 0)
+nightShiftByWeekday = ('n', 'n', 'nhwk', 'nhwk', 'wn', 'wn', 'nhwk')
+
+
+class CalendarTable:
+    """Day type table for the days 1..numDays of the planning horizon.
+
+    Every column is an array indexed by day number. Index 0 is the day
+    before the horizon (the last day of the previous month) and index
+    numDays+1 the day after it, so d-1 and d+1 can be looked up like any
+    other day. The per-day flags are False there.
+
+    Days before firstDay are carried over from the previous period: they
+    are part of the model so that rest rules see them, but they are not
+    planned again.
+    """
+
+    def __init__(self, start, numDays, holidayCalendar=None, teamMeetings=(), noDayshift=(), replaceHwkWithN=(), firstDay=1):
+        self.start = start
+        self.numDays = numDays
+        self.days = range(1, numDays + 1)
+        self.firstDay = firstDay
+        self.planned = range(firstDay, numDays + 1)
+        self.dates = [start + datetime.timedelta(days=d - 1) for d in range(numDays + 2)]
+
+        self.weekday = np.array([date.weekday() for date in self.dates], dtype=np.int8)
+        self.weekend = self.weekday >= 5
+        self.holiday = self.flags(d for d in self.days if holidayCalendar is not None and self.dates[d] in holidayCalendar)
+        self.team_meeting = self.flags(teamMeetings)
+        self.no_dayshift = self.flags(noDayshift)
+        self.replace_hwk_with_n = self.flags(replaceHwkWithN)
+
+        night = np.array(nightShiftByWeekday)[self.weekday]
+        night[(night == 'nhwk') & self.replace_hwk_with_n] = 'n'
+        self.night = night
+
+    def flags(self, days):
+        column = np.zeros(self.numDays + 2, dtype=bool)
+        for d in days:
+            if 1 <= d <= self.numDays:
+                column[d] = True
+        return column
+
+    def freeDaysCount(self, days=None):
+        """Number of weekend days and public holidays among days (default: all planned days)."""
+        if days is None:
+            days = self.planned
+        free = self.weekend | self.holiday
+        return int(np.count_nonzero(free[days.start:days.stop]))
+
+    def periods(self):
+        """The planned days split by calendar month, as a list of ranges."""
+        periods = []
+        start = self.firstDay
+        for d in self.planned:
+            if self.dates[d + 1].month != self.dates[d].month or d == self.numDays:
+                periods.append(range(start, d + 1))
+                start = d + 1
+        return periods
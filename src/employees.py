@@ -0,0 +1,257 @@
+"""Employee store, parsed once from employee.csv (or .json/.yaml) and
+validated before any model is built."""
+import csv
+import datetime
+import json
+
+NIGHT_SHIFTS = frozenset(['n', 'nhwk', 'wn'])
+SHIFTS = NIGHT_SHIFTS | {'d'}
+
+# columns every employee needs; max_consec_shifts is optional
+COLUMNS = ['name', 'hours_per_week', 'overtime', 'available_for_shift', 'not_replaced_by', 'double_shift',
+           'no_single_dayshift', '48_hour_shifts', 'can_be_single', 'prefFree', 'vacation', 'forced_shifts']
+
+
+class InvalidInput(ValueError):
+    """Employee or config input which cannot be read, with every problem found."""
+
+    def __init__(self, problems):
+        ValueError.__init__(self, '\n'.join(problems))
+        self.problems = problems
+
+
+class DayNumbers:
+    """Turns day tokens into day numbers of the planning horizon.
+
+    A plain number is a day of the configured month and may run past its
+    end ("35" is the 4th of the next month for a 31 day month). An ISO date
+    ("2022-04-27") is taken as is. The horizon may start before the
+    configured month, e.g. with the carried over days of a rolling window.
+    """
+
+    def __init__(self, monthStart=None, horizonStart=None):
+        self.horizonStart = horizonStart or monthStart
+        self.offset = (monthStart - self.horizonStart).days if monthStart else 0
+
+    def __call__(self, token):
+        token = token.strip()
+        if '-' in token:
+            if self.horizonStart is None:
+                raise ValueError('date %s needs a planning horizon' % token)
+            try:
+                return (datetime.date.fromisoformat(token) - self.horizonStart).days + 1
+            except ValueError:
+                raise ValueError('%s is not a date like 2022-04-27' % token) from None
+        try:
+            return int(token) + self.offset
+        except ValueError:
+            raise ValueError('%s is not a day number or date' % token) from None
+
+
+def parseDays(value, dayNumber=DayNumbers()):
+    """Parse a ',' separated day list like "4,5" into a frozenset of day numbers."""
+    return frozenset(dayNumber(v) for v in value.split(',') if v.strip())
+
+
+def parseNames(value):
+    """Parse a ',' separated list like "H,K" into a frozenset of strings."""
+    return frozenset(v.strip() for v in value.split(',') if v.strip())
+
+
+def parseShifts(value):
+    """Parse a ',' separated list of shift types like "n,d" into a frozenset."""
+    shifts = parseNames(value)
+    for s in shifts:
+        if s not in SHIFTS:
+            raise ValueError('unknown shift %s, choose from %s' % (s, ', '.join(sorted(SHIFTS))))
+    return shifts
+
+
+def parseForcedShifts(value, dayNumber=DayNumbers()):
+    """Parse forced shifts like "27/d,26/n" into {day: frozenset(shifts)}."""
+    forced = {}
+    for entry in value.split(','):
+        if not entry.strip():
+            continue
+        if entry.count('/') != 1:
+            raise ValueError('%s is not day/shift, e.g. 27/d' % entry.strip())
+        day, shift = entry.strip().split('/')
+        forced.setdefault(dayNumber(day), set()).update(parseShifts(shift))
+    return {day: frozenset(s) for (day, s) in forced.items()}
+
+
+def parseYesNo(value):
+    value = value.strip()
+    if value not in ('yes', 'no', ''):
+        raise ValueError('%s is not yes or no' % value)
+    return value == 'yes'
+
+
+def parseInt(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('%s is not a whole number' % value.strip()) from None
+
+
+def recordValue(value):
+    """A value of a JSON/YAML employee as the text of its CSV column."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'yes' if value else 'no'
+    if isinstance(value, (list, tuple)):
+        return ','.join(str(v) for v in value)
+    return str(value)
+
+
+def readRecords(path):
+    """The employees of path as dicts of column texts, one after another.
+
+    A .json file holds a list of objects (or {"employees": [...]}), a
+    .yaml/.yml file the same (needs PyYAML); lists may be given as lists and
+    yes/no as booleans. Anything else is read as CSV, row by row.
+    """
+    if path.endswith(('.json', '.yaml', '.yml')):
+        with open(path) as f:
+            if path.endswith('.json'):
+                data = json.load(f)
+            else:
+                import yaml
+                data = yaml.safe_load(f)
+        if isinstance(data, dict):
+            data = data.get('employees')
+        if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+            raise InvalidInput(['%s: expected a list of employees' % path])
+        for record in data:
+            yield {k: recordValue(v) for (k, v) in record.items()}
+    else:
+        with open(path, newline='') as f:
+            reader = csv.DictReader(f)
+            missing = [c for c in COLUMNS if c not in (reader.fieldnames or [])]
+            if missing:
+                raise InvalidInput(['%s: missing columns %s' % (path, ', '.join(missing))])
+            yield from reader
+
+
+class Employee:
+    """One row of employee.csv with every list pre-parsed."""
+
+    __slots__ = ('name', 'hours_per_week', 'overtime', 'available', 'not_replaced_by',
+                 'double_shift', 'no_single_dayshift', 'does48hours', 'can_be_single',
+                 'pref_free', 'vacation', 'forced', 'max_consec_shifts')
+
+    def __init__(self, row, dayNumber=DayNumbers()):
+        """Raises InvalidInput listing every missing or invalid column of row."""
+        problems = []
+
+        def column(name, parse, optional=False):
+            value = row.get(name)
+            if value is None:
+                if not optional:
+                    problems.append('column %s is missing' % name)
+                value = ''
+            try:
+                return parse(value)
+            except ValueError as e:
+                problems.append('%s: %s' % (name, e))
+
+        self.name = (row.get('name') or '').strip()
+        if not self.name:
+            problems.append('the name is empty')
+        self.hours_per_week = column('hours_per_week', parseInt)
+        self.overtime = column('overtime', parseInt)
+        self.available = column('available_for_shift', parseShifts)
+        self.not_replaced_by = column('not_replaced_by', parseNames)
+        self.double_shift = column('double_shift', parseYesNo)
+        self.no_single_dayshift = column('no_single_dayshift', parseYesNo)
+        self.does48hours = column('48_hour_shifts', parseYesNo)
+        self.can_be_single = column('can_be_single', parseYesNo)
+        self.pref_free = column('prefFree', lambda v: parseDays(v, dayNumber))
+        self.vacation = column('vacation', lambda v: parseDays(v, dayNumber))
+        self.forced = column('forced_shifts', lambda v: parseForcedShifts(v, dayNumber))
+        # optional column, overrides max_consec_shifts of config.ini
+        self.max_consec_shifts = column('max_consec_shifts', lambda v: parseInt(v) if v.strip() else None, optional=True)
+        if problems:
+            raise InvalidInput(problems)
+
+    def isForced(self, day, shift):
+        """True if the employee has to cover shift on day.
+
+        A forced night shift ("27/n") covers whichever night shift type
+        exists on that day.
+        """
+        forced = self.forced.get(day)
+        if not forced:
+            return False
+        return shift in forced or (shift in NIGHT_SHIFTS and not forced.isdisjoint(NIGHT_SHIFTS))
+
+
+class EmployeeTable:
+    """All employees, in file order, with O(1) lookup by name."""
+
+    def __init__(self, employees):
+        self.byName = {e.name: e for e in employees}
+        self.names = list(self.byName)
+
+    @classmethod
+    def load(cls, path, monthStart=None, horizonStart=None):
+        """Load employee.csv (or .json/.yaml, see readRecords), with its days
+        numbered from horizonStart (default: monthStart).
+
+        Raises InvalidInput with every problem of the file: invalid columns,
+        duplicate names and unknown names in not_replaced_by.
+        """
+        dayNumber = DayNumbers(monthStart, horizonStart)
+        employees = []
+        names = set()
+        references = []
+        problems = []
+        for (i, row) in enumerate(readRecords(path)):
+            where = '%s employee %i' % (path, i + 1)
+            name = (row.get('name') or '').strip()
+            if name in names:
+                problems.append('%s: %s is listed twice' % (where, name))
+            names.add(name)
+            references.append((name, parseNames(row.get('not_replaced_by') or '')))
+            try:
+                employees.append(Employee(row, dayNumber))
+            except InvalidInput as error:
+                problems += ['%s (%s): %s' % (where, name, p) for p in error.problems]
+        for (name, replacedBy) in references:
+            for n in sorted(replacedBy - names):
+                problems.append('%s: not_replaced_by names unknown employee %s' % (name, n))
+        if problems:
+            raise InvalidInput(problems)
+        return cls(employees)
+
+    def interchangeable(self):
+        """Groups (lists of names, in file order) of at least two employees
+        which only differ by their name.
+
+        Employees with personal days, or which others do not want to be
+        replaced by, are never interchangeable.
+        """
+        referenced = set()
+        for e in self:
+            referenced |= e.not_replaced_by
+        groups = {}
+        for e in self:
+            if e.pref_free or e.vacation or e.forced or e.name in referenced:
+                continue
+            key = (e.hours_per_week, e.overtime, e.available, e.not_replaced_by, e.double_shift,
+                   e.no_single_dayshift, e.does48hours, e.can_be_single, e.max_consec_shifts)
+            groups.setdefault(key, []).append(e.name)
+        return [names for names in groups.values() if len(names) > 1]
+
+    def __getitem__(self, name):
+        return self.byName[name]
+
+    def __contains__(self, name):
+        return name in self.byName
+
+    def __iter__(self):
+        return iter(self.byName.values())
+
+    def __len__(self):
+        return len(self.byName)
@@ -0,0 +1,237 @@
+"""Why a scenario has no schedule: a pre-check of the input before the model
+is built, and the conflicting constraint families of an infeasible model."""
+import time
+
+from ortools.sat.python import cp_model
+
+# constraint families (phases of buildSchedule) explain() can switch off;
+# the others only define worktime and objective or fix the carried over days
+explainedFamilies = ['coverage', 'forced_shifts', 'following_employee', 'one_shift_per_day', 'free_weekend',
+                     'assure_free_days', 'max_n_days_consec_shifts', 'no_single_dayshift', 'last_month',
+                     'sequences', 'double_shift', 'max_two_consec_dayshifts']
+
+
+class InfeasibleInput(ValueError):
+    """The input cannot have a schedule, see precheck()."""
+
+    def __init__(self, problems):
+        ValueError.__init__(self, '\n'.join(problems))
+        self.problems = problems
+
+
+def restsOnFirstNight(cal, employee, lastNights):
+    """Whether employee may not take the night shift of day 1 after the night
+    shift taken over from the last month (lastNights). A rolling window with
+    overlap days carries that night in its fixed days instead, and 48 hour
+    shifts may take two nights."""
+    return cal.firstDay == 1 and employee.name in lastNights and not employee.does48hours
+
+
+def precheck(config, cal, employees, lastNights={}):
+    """Checks the input of a model of the planned days of cal.
+
+    Returns (errors, warnings). Errors are input which has no schedule for
+    sure: a required shift nobody can cover, or forced shifts colliding with
+    each other or with the rules. Warnings do not stop the solver.
+    """
+    errors = []
+    warnings = []
+    one_empl_per_period = config["Constraints"]["one_empl_per_period"] == 'True'
+    one_shift_per_day = config["Constraints"]["one_shift_per_day"] == 'True'
+    assure_free_days = config["Constraints"]["assure_free_days"] == 'True'
+    respect_pref_free = config["Constraints"]["respect_pref_free"] == 'True'
+    force_pref_free = config["General"]["force_pref_free"] == 'True'
+    dayShiftMinutes = int(float(config["Shift_worktimes"]["dayShiftHours"]) * 60)
+    nightShiftMinutes = {'n': int(float(config["Shift_worktimes"]["nightShiftHoursN"]) * 60),
+                         'nhwk': int(float(config["Shift_worktimes"]["nightShiftHoursHWK"]) * 60),
+                         'wn': int(float(config["Shift_worktimes"]["nightShiftHoursWeekend"]) * 60)}
+
+    for name in lastNights:
+        if name not in employees:
+            errors.append('nightshift_last_month %s is not an employee' % name)
+
+    reqMinutes = 0
+    for d in cal.planned:
+        date = cal.dates[d]
+        night = str(cal.night[d])
+        covered = [night]
+        if not cal.no_dayshift[d]:
+            reqMinutes += dayShiftMinutes
+            covered.append('d')
+        reqMinutes += nightShiftMinutes[night]
+
+        for s in covered:
+            # the weekend day shift is optional, but never doubled
+            required = s != 'd' or not cal.weekend[d]
+            if s == 'd':
+                able = [e for e in employees if d not in e.vacation and 'd' in e.available]
+            else:
+                able = [e for e in employees if d not in e.vacation and d + 1 not in e.vacation and s in e.available
+                        and not (d == 1 and restsOnFirstNight(cal, e, lastNights))]
+            forced = [e.name for e in able if e.isForced(d, s)]
+            if one_empl_per_period and required and not able:
+                errors.append('%s: nobody is available for the %s shift' % (date, s))
+            if one_empl_per_period and len(forced) > 1:
+                errors.append('%s: %s are all forced to the %s shift' % (date, ', '.join(forced), s))
+
+    for e in employees:
+        for d in sorted(e.forced):
+            if d not in cal.planned:
+                continue
+            date = cal.dates[d]
+            shifts = [s for s in ('d', str(cal.night[d])) if e.isForced(d, s)]
+            for s in shifts:
+                if d in e.vacation or (s != 'd' and d + 1 in e.vacation):
+                    warnings.append('%s: forced %s shift of %s is ignored, %s is on vacation' % (date, s, e.name, e.name))
+                elif s not in e.available:
+                    warnings.append('%s: forced %s shift of %s is ignored, %s is not available for it' % (date, s, e.name, e.name))
+            if one_shift_per_day and len(shifts) > 1:
+                errors.append('%s: %s is forced to more than one shift' % (date, e.name))
+            if assure_free_days and respect_pref_free and force_pref_free and shifts and d in e.pref_free:
+                errors.append('%s: %s is forced to work on a preferred free day' % (date, e.name))
+
+    # targets without overtime, worktime is not a hard rule
+    free_days_count = cal.freeDaysCount() if assure_free_days else 0
+    capacity = sum(int(e.hours_per_week / 5 * (len(cal.planned) - free_days_count) * 60) for e in employees)
+    if capacity < reqMinutes:
+        warnings.append('The current employee setup cannot fulfill the worktime requirements '
+                        '(%i of %i minutes). They will work overtime.' % (capacity, reqMinutes))
+    return errors, warnings
+
+
+def constraintVariables(ct):
+    """Indices of the variables a ConstraintProto refers to."""
+    refs = list(ct.enforcement_literal)
+    if ct.has_linear():
+        refs += ct.linear.vars
+    elif ct.has_table():
+        for expr in ct.table.exprs:
+            refs += expr.vars
+        refs += ct.table.vars
+    elif ct.has_bool_or():
+        refs += ct.bool_or.literals
+    elif ct.has_bool_and():
+        refs += ct.bool_and.literals
+    elif ct.has_at_most_one():
+        refs += ct.at_most_one.literals
+    elif ct.has_exactly_one():
+        refs += ct.exactly_one.literals
+    return {r if r >= 0 else -r - 1 for r in refs}
+
+
+def gateFamilies(model, families, names):
+    """Puts each constraint family of names behind a new enforcement literal.
+
+    families maps family names to the range of their constraint indices,
+    see Schedule.families. Returns {name: literal}.
+    """
+    proto = model.Proto()
+    literals = {}
+    for name in names:
+        if name not in families:
+            continue
+        literals[name] = model.NewBoolVar('enforce %s' % name)
+        for i in families[name]:
+            proto.constraints[i].enforcement_literal.append(literals[name].Index())
+    return literals
+
+
+def newSolver(params):
+    solver = cp_model.CpSolver()
+    for (k, v) in params.items():
+        setattr(solver.parameters, k, v)
+    return solver
+
+
+def shrinkCore(model, core, fixed, params, deadline):
+    """Drops the literals of an infeasible core one after another as long as
+    the rest stays infeasible, until deadline (time.perf_counter()).
+
+    fixed are assumptions kept in every solve. Returns the smaller core.
+    """
+    core = list(core)
+    for lit in list(core):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        if all(other is not lit for other in core):
+            continue
+        rest = [other for other in core if other is not lit]
+        model.ClearAssumptions()
+        model.AddAssumptions(rest + fixed)
+        solver = newSolver(dict(params, max_time_in_seconds=remaining))
+        if solver.Solve(model) == cp_model.INFEASIBLE:
+            found = set(solver.SufficientAssumptionsForInfeasibility())
+            core = [other for other in rest if other.Index() in found]
+    return core
+
+
+def explain(schedule, params={}):
+    """Explains an infeasible schedule by its conflicting constraint families.
+
+    Solves a copy of the model without objective, with every family of
+    explainedFamilies behind an assumption literal. If it is infeasible, the
+    core is shrunk to families which conflict by themselves, their
+    constraints get one literal each, that core is shrunk too, and the
+    employees and days are looked up from the shifts and days off they
+    refer to. max_time_in_seconds of params limits each of the two steps.
+    Returns (status, conflicts): the status name of the first solve, and
+    if it is INFEASIBLE a list of (family, employees, dates) sorted by
+    family, else None. UNKNOWN means the check did not finish in time.
+    """
+    families = schedule.families
+    limit = params.get('max_time_in_seconds', 60.0)
+    model = schedule.model.Clone()
+    model.ClearObjective()
+    # symmetry breaking is only valid for the full model
+    fixed = [lit.Not() for lit in gateFamilies(model, families, ['symmetry']).values()]
+    literals = gateFamilies(model, families, explainedFamilies)
+    model.AddAssumptions(list(literals.values()) + fixed)
+    solver = newSolver(params)
+    schedule.metrics.start('explain_families')
+    started = time.perf_counter()
+    status = solver.Solve(model)
+    if status != cp_model.INFEASIBLE:
+        schedule.metrics.stop()
+        return solver.StatusName(status), None
+    found = set(solver.SufficientAssumptionsForInfeasibility())
+    core = shrinkCore(model, [lit for lit in literals.values() if lit.Index() in found], fixed, params, started + limit)
+    schedule.metrics.stop()
+    inCore = {lit.Index() for lit in core}
+    conflicting = [name for (name, lit) in literals.items() if lit.Index() in inCore]
+
+    # one literal per constraint of the conflicting families
+    model = schedule.model.Clone()
+    model.ClearObjective()
+    proto = model.Proto()
+    fixed = [lit.Not() for lit in gateFamilies(model, families, ['symmetry']).values()]
+    for lit in gateFamilies(model, families, [n for n in explainedFamilies if n not in conflicting]).values():
+        fixed.append(lit.Not())
+    constraints = {}
+    for name in conflicting:
+        for i in families[name]:
+            lit = model.NewBoolVar('enforce %s %i' % (name, i))
+            proto.constraints[i].enforcement_literal.append(lit.Index())
+            constraints[lit.Index()] = (lit, name, i)
+    model.AddAssumptions([lit for (lit, name, i) in constraints.values()] + fixed)
+    solver = newSolver(params)
+    schedule.metrics.start('explain_constraints')
+    started = time.perf_counter()
+    core = []
+    if solver.Solve(model) == cp_model.INFEASIBLE:
+        found = set(solver.SufficientAssumptionsForInfeasibility())
+        core = shrinkCore(model, [lit for (lit, name, i) in constraints.values() if lit.Index() in found], fixed, params,
+                          started + limit)
+    schedule.metrics.stop()
+
+    keys = {var.Index(): (n, d) for ((n, d, s), var) in schedule.shifts.items()}
+    keys.update((var.Index(), key) for (key, var) in schedule.freeDays.items())
+    found = {name: (set(), set()) for name in conflicting}
+    for lit in core:
+        lit, name, i = constraints[lit.Index()]
+        for v in constraintVariables(proto.constraints[i]):
+            if v in keys:
+                n, d = keys[v]
+                found[name][0].add(n)
+                found[name][1].add(schedule.cal.dates[d])
+    return 'INFEASIBLE', [(name, sorted(found[name][0]), sorted(found[name][1])) for name in sorted(conflicting)]
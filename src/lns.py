@@ -0,0 +1,95 @@
+"""Large neighbourhood search around a solved Schedule.
+
+Every move fixes the shifts of the incumbent schedule except those of a
+neighbourhood, which get the incumbent as hint, and re-solves the model
+briefly. The incumbent is only replaced by a better solution.
+
+A neighbourhood is a function (schedule, rng) -> set of shift keys
+(name, day, shift) to re-open; more can be added to neighbourhoods.
+"""
+import random
+import time
+
+from ortools.sat.python import cp_model
+
+from employees import NIGHT_SHIFTS
+
+
+def weekNeighbourhood(schedule, rng):
+    """All shifts of one random calendar week of the planned days."""
+    cal = schedule.cal
+    weeks = sorted({cal.dates[d].isocalendar()[:2] for d in cal.planned})
+    week = rng.choice(weeks)
+    return {k for k in schedule.shifts if k[1] in cal.planned and cal.dates[k[1]].isocalendar()[:2] == week}
+
+
+def employeesNeighbourhood(schedule, rng, share=0.2):
+    """All planned shifts of a random share (at least two) of the employees."""
+    names = schedule.employees.names
+    chosen = set(rng.sample(names, min(len(names), max(2, int(len(names) * share)))))
+    return {k for k in schedule.shifts if k[0] in chosen and k[1] in schedule.cal.planned}
+
+
+def employeeMonthNeighbourhood(schedule, rng):
+    """The shifts of one calendar month of a random employee, and of a second
+    one to swap shifts with."""
+    cal = schedule.cal
+    names = rng.sample(schedule.employees.names, min(2, len(schedule.employees.names)))
+    period = rng.choice(cal.periods())
+    return {k for k in schedule.shifts if k[0] in names and k[1] in period}
+
+
+def weekendNightsNeighbourhood(schedule, rng):
+    """All night shifts starting on a Friday, Saturday or Sunday."""
+    cal = schedule.cal
+    return {k for k in schedule.shifts if k[2] in NIGHT_SHIFTS and k[1] in cal.planned and cal.weekday[k[1]] >= 4}
+
+
+neighbourhoods = {'week': weekNeighbourhood,
+                  'employee_month': employeeMonthNeighbourhood,
+                  'weekend_nights': weekendNightsNeighbourhood,
+                  'employees': employeesNeighbourhood}
+
+
+def improve(schedule, solver, params={}, moves=10, neighbourhoodNames=None, seed=1):
+    """Improves the solution of solver by the given number of moves, one after another.
+
+    solver has solved schedule.model or a copy of it; params are the CP-SAT
+    parameters of every move. neighbourhoodNames are the neighbourhoods of
+    the moves, taken in turn (default: all). Every move is logged to
+    schedule.metrics.info['lns']. Returns the solver of the best solution.
+    """
+    neighbourhoodNames = neighbourhoodNames or list(neighbourhoods)
+    for name in neighbourhoodNames:
+        if name not in neighbourhoods:
+            raise ValueError('unknown neighbourhood %s, choose from %s' % (name, ', '.join(neighbourhoods)))
+    rng = random.Random(seed)
+    log = schedule.metrics.info.setdefault('lns', [])
+    best = solver
+    started = time.perf_counter()
+    for i in range(moves):
+        name = neighbourhoodNames[i % len(neighbourhoodNames)]
+        free = neighbourhoods[name](schedule, rng)
+        model = schedule.model.Clone()
+        model.ClearHints()
+        for (key, var) in schedule.shifts.items():
+            value = int(best.BooleanValue(var))
+            if key in free:
+                model.AddHint(var, value)
+            else:
+                model.Add(var == value)
+
+        candidate = cp_model.CpSolver()
+        for (k, v) in params.items():
+            setattr(candidate.parameters, k, v)
+        status = candidate.Solve(model)
+        before = best.ObjectiveValue()
+        improved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE) and candidate.ObjectiveValue() < before
+        if improved:
+            best = candidate
+        log.append({'move': i + 1, 'neighbourhood': name, 'free': len(free), 'status': candidate.StatusName(status),
+                    'objective': best.ObjectiveValue(), 'improvement': before - best.ObjectiveValue(),
+                    'seconds': round(time.perf_counter() - started, 3)})
+        print('  move %i (%s, %i free shifts): objective %i, %i better, %.2f s' % (
+            i + 1, name, len(free), best.ObjectiveValue(), before - best.ObjectiveValue(), log[-1]['seconds']))
+    return best
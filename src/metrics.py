@@ -0,0 +1,79 @@
+"""Phase timing and model size metrics of a run."""
+import json
+import sys
+import time
+
+
+def modelSize(model):
+    """(variables, constraints) of a CpModel, (0, 0) without a model."""
+    if model is None:
+        return (0, 0)
+    proto = model.Proto()
+    return (len(proto.variables), len(proto.constraints))
+
+
+def parseResponseStats(stats):
+    """Turns solver.ResponseStats() into a dict, numbers converted."""
+    parsed = {}
+    for line in stats.splitlines():
+        if ':' not in line:
+            continue
+        key, value = (v.strip() for v in line.split(':', 1))
+        if not value:
+            continue
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        parsed[key] = value
+    return parsed
+
+
+class Metrics:
+    """Wall time and added variables/constraints of each phase of one model.
+
+    Phases are sequential: start() ends the running phase and begins the
+    next one, so the model builder only needs a checkpoint in front of
+    each constraint family.
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.solver = {}
+        self.info = {}
+        self.current = None
+
+    def start(self, name, model=None):
+        self.stop()
+        self.current = (name, model, modelSize(model), time.perf_counter())
+
+    def stop(self):
+        if self.current is None:
+            return
+        name, model, (variables, constraints), started = self.current
+        after = modelSize(model)
+        self.phases.append({'phase': name,
+                            'seconds': round(time.perf_counter() - started, 6),
+                            'variables': after[0] - variables,
+                            'constraints': after[1] - constraints})
+        self.current = None
+
+    def addSolver(self, solver, status):
+        self.solver = {'status': solver.StatusName(status),
+                       'wall_time': solver.WallTime(),
+                       'response_stats': parseResponseStats(solver.ResponseStats())}
+
+    def asDict(self):
+        self.stop()
+        return {'phases': self.phases, 'solver': self.solver, 'info': self.info}
+
+    def write(self, path, **extra):
+        """Appends the metrics as one JSON line to path, '-' writes to stderr."""
+        line = json.dumps(dict(extra, **self.asDict()))
+        if path == '-':
+            print(line, file=sys.stderr)
+        else:
+            with open(path, 'a') as f:
+                f.write(line + '\n')
@@ -0,0 +1,119 @@
+"""The PDF of a solved schedule, split into pages so large rosters and long
+horizons stay readable.
+
+Each month is cut into blocks of whole weeks and each block into blocks of
+employees, one page each. Pages are drawn and written one after another,
+only one figure is alive at a time however long the horizon is.
+"""
+import calendar
+
+import numpy as np
+
+weekendColour = '#42ff9a'
+fontSize = 8
+# inches of the row label column, a schedule column, a table row and the page margin
+labelWidth = 1.8
+columnWidth = 1.1
+rowHeight = 0.25
+margin = 0.1
+
+
+def weekBlocks(cal, period, weeksPerPage):
+    """The days of period in blocks of weeksPerPage calendar weeks."""
+    weeks = []
+    for d in period:
+        week = cal.dates[d].isocalendar()[:2]
+        if not weeks or weeks[-1][0] != week:
+            weeks.append((week, []))
+        weeks[-1][1].append(d)
+    return [[d for (week, days) in weeks[i:i + weeksPerPage] for d in days] for i in range(0, len(weeks), weeksPerPage)]
+
+
+def pages(cal, employees, weeksPerPage=5, employeesPerPage=10):
+    """(days, employee indices) of each schedule page, month by month."""
+    blocks = [range(i, min(i + employeesPerPage, employees)) for i in range(0, employees, employeesPerPage)]
+    for period in cal.periods():
+        for days in weekBlocks(cal, period, weeksPerPage):
+            for block in blocks:
+                yield days, block
+
+
+def drawTable(title, rowLabels, colLabels, cells, rowColours, fonts):
+    """A figure sized to the table, rowColours is the background of each row
+    (None: white), fonts the (title, cell) FontProperties.
+
+    matplotlib's ax.table makes a patch and a text for every cell and
+    measures each of them while drawing, which is slow for large pages.
+    Here the shaded rows are one collection, the grid another, and only
+    non-empty cells get a text, all with the same font properties.
+    """
+    from matplotlib.collections import LineCollection, PolyCollection
+    from matplotlib.figure import Figure
+
+    width = labelWidth + columnWidth * len(colLabels)
+    height = rowHeight * (len(rowLabels) + 2)
+    # a bare Figure, pyplot would keep every page alive until it is closed
+    fig = Figure(figsize=(width + 2 * margin, height + 2 * margin))
+    # axes in inches, rows counted downwards
+    ax = fig.add_axes((0, 0, 1, 1))
+    ax.axis('off')
+    ax.set_xlim(-margin, width + margin)
+    ax.set_ylim(height + margin, -margin)
+
+    left = labelWidth
+    top = rowHeight
+    bottom = top + rowHeight * (len(rowLabels) + 1)
+    xs = left + columnWidth * np.arange(len(colLabels) + 1)
+    ys = top + rowHeight * np.arange(len(rowLabels) + 2)
+    titleFont, cellFont = fonts
+    shaded = [i for (i, c) in enumerate(rowColours) if c is not None]
+    if shaded:
+        ax.add_collection(PolyCollection([[(0, ys[i + 1]), (width, ys[i + 1]), (width, ys[i + 2]), (0, ys[i + 2])] for i in shaded],
+                                         facecolors=[rowColours[i] for i in shaded], linewidths=0))
+    ax.add_collection(LineCollection([[(0, y), (width, y)] for y in ys] + [[(x, top), (x, bottom)] for x in np.append(0, xs)],
+                                     colors='black', linewidths=0.5))
+
+    ax.text(0.05, top / 2, title, va='center', fontproperties=titleFont)
+    for (x, label) in zip(xs, colLabels):
+        ax.text(x + columnWidth / 2, ys[0] + rowHeight / 2, label, ha='center', va='center', fontproperties=cellFont)
+    for (y, label, row) in zip(ys[1:], rowLabels, cells):
+        ax.text(0.05, y + rowHeight / 2, label, va='center', fontproperties=cellFont)
+        for (x, text) in zip(xs, row):
+            if text:
+                ax.text(x + columnWidth / 2, y + rowHeight / 2, text, ha='center', va='center', fontproperties=cellFont)
+    return fig
+
+
+def writePdf(path, cal, names, ranges, worktime, freeDays, weeksPerPage=5, employeesPerPage=10):
+    """Writes the schedule to path.
+
+    ranges are the working hours of each employee and planned day (array of
+    shape (employees, planned days), see scheduler.timeRanges), worktime
+    the (labels, rows) of scheduler.worktimeTable. Returns the page count.
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.font_manager import FontProperties
+
+    names = np.asarray(names)
+    labels = np.array([cal.dates[d].strftime('%Y-%m-%d %A') for d in range(len(cal.dates))])
+    rowColours = np.where(cal.weekend, weekendColour, None)
+    fonts = (FontProperties(size=fontSize + 2), FontProperties(size=fontSize))
+    count = 0
+    with PdfPages(path) as pp:
+        for (days, block) in pages(cal, len(names), weeksPerPage, employeesPerPage):
+            first = cal.dates[days[0]]
+            title = '%s %i, %s - %s' % (calendar.month_name[first.month], first.year, names[block[0]], names[block[-1]])
+            columns = np.array(days) - cal.firstDay
+            cells = ranges[block.start:block.stop, columns].T
+            pp.savefig(drawTable(title, labels[days].tolist(), names[block].tolist(), cells.tolist(), rowColours[days].tolist(), fonts))
+            count += 1
+
+        # worktime one employee per row
+        ind, rows = worktime
+        table = np.array([['%.1f' % v if isinstance(v, float) else v for v in r] for r in rows], dtype=object).T
+        for start in range(0, len(names), 3 * employeesPerPage):
+            stop = start + 3 * employeesPerPage
+            pp.savefig(drawTable('Worktime, required free days %s' % freeDays, names[start:stop].tolist(), ind, table[start:stop].tolist(),
+                                 [None] * len(table[start:stop]), fonts))
+            count += 1
+    return count
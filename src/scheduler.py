@@ -1,19 +1,27 @@
 """Example of a simple nurse scheduling problem."""
-import math
+import argparse
+import concurrent.futures
+import contextlib
+import copy
+import itertools
+import json
+import os
 import subprocess
 import sys
-from turtle import color
 from ortools.sat.python import cp_model
+import numpy as np
 import csv
 import configparser
-import numpy as np
-import pandas as pd
 import calendar
 import datetime
-import holidays
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-from collections import defaultdict
+# matplotlib and holidays are imported where they are needed, runs
+# which do not render or count public holidays start without them
+from employees import NIGHT_SHIFTS, DayNumbers, EmployeeTable, InvalidInput, parseDays, parseInt
+from calendartable import CalendarTable
+from feasibility import InfeasibleInput, explain, gateFamilies, precheck, restsOnFirstNight
+from metrics import Metrics
+import lns
+import pdfroster
 
 employeeFile = "employee.csv"
 configFile = "config.ini"
@@ -23,8 +31,6 @@ version = "1.0.1"
 #max workstime per employee in minutes
 hardCap = 40*40
 
-month = ""
-year = ""
 subdivision = ""
 
 #contraints
@@ -46,71 +52,818 @@ max_consec_shifts = 5
 
 forced_shift_entries = []
 
-nightshift_last_month = ""
+# [Shift_worktimes] keys (and default hours) of the part of a night shift
+# from the previous month which falls into day 1
+lastMonthHoursKeys = {'n': ('lastMonthHoursN', '9.25'), 'wn': ('lastMonthHoursWeekend', '5.25'), 'nhwk': ('lastMonthHoursHWK', '8.5')}
+
+nightShifts = sorted(NIGHT_SHIFTS)
+
+# shift sequences on consecutive days (shift on day d, d+1, ...) nobody may
+# work in full, as used by addSequenceRules
+forbiddenSequences = [
+    ('nhwk', 'n', 'n'), ('n', 'n', 'nhwk'), ('n', 'nhwk', 'nhwk'), ('nhwk', 'nhwk', 'wn'),
+    ('nhwk', 'wn', 'wn'), ('wn', 'wn', 'nhwk'), ('wn', 'nhwk', 'n'),
+]
+# additionally forbidden without 48 hour shifts: two nights in a row
+forbiddenWithout48Hours = [(a, b) for a in nightShifts for b in nightShifts]
+# additionally forbidden without double shifts: a day shift after a night
+forbiddenWithoutDoubleShift = [(a, 'd') for a in nightShifts]
+# with double shifts: a free day after a night followed by a day shift
+restAfterDoubleShift = [(a, 'd', b) for a in nightShifts for b in nightShifts + ['d']]
+
+# shift order of the solution array, see assignmentArray
+arrayShifts = ['d', 'n', 'wn', 'nhwk']
+# start and end of each shift, the night shifts end on the next day
+shiftTimes = {'d': ('14:00', '20:00'), 'n': ('13:00', '13:30'), 'wn': ('13:00', '13:30'), 'nhwk': ('13:00', '09:00')}
+
+# [Constraints] flags which only switch one constraint family (phase of
+# buildSchedule) on or off, and their family
+toggleFlags = {'one_empl_per_period': 'coverage',
+               'one_shift_per_day': 'one_shift_per_day',
+               'free_weekend': 'free_weekend',
+               'assure_free_days': 'assure_free_days',
+               'respect_following_employee': 'following_employee',
+               'respect_no_single_dayshift': 'no_single_dayshift',
+               'max_n_days_consec_shifts': 'max_n_days_consec_shifts',
+               'max_two_consec_dayshifts': 'max_two_consec_dayshifts'}
+
+# terms of the [Objective] section, in their default priority
+objectiveTerms = ['overtime', 'pref_free', 'weekend_fairness', 'minimal_change']
+defaultObjectiveWeights = {'overtime': 1, 'pref_free': 60, 'weekend_fairness': 0}
+
+# CP-SAT parameters which can be set in the [Solver] section or on the
+# command line, passed unchanged to solver.parameters
+solverParameterTypes = {
+    'num_workers': int,
+    'max_time_in_seconds': float,
+    'relative_gap_limit': float,
+    'random_seed': int,
+    'linearization_level': int,
+}
+
+def parseNumber(value):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError('%s is not a number' % value.strip()) from None
+
+def parseFlag(value):
+    if value.strip() not in ('True', 'False'):
+        raise ValueError('%s is not True or False' % value.strip())
+    return value.strip() == 'True'
+
+def parseDayList(value):
+    return parseDays(value, DayNumbers(datetime.date(2000, 1, 1)))
+
+def parseChoice(choices):
+    """Parser of one of choices."""
+    def parse(value):
+        if value.strip() not in choices:
+            raise ValueError('unknown value %s, choose from %s' % (value.strip(), ', '.join(choices)))
+        return value.strip()
+    return parse
+
+def parseChoiceList(choices):
+    """Parser of a comma separated list of choices."""
+    def parse(value):
+        values = [v.strip() for v in value.split(',') if v.strip()]
+        unknown = [v for v in values if v not in choices]
+        if unknown:
+            raise ValueError('unknown %s, choose from %s' % (', '.join(unknown), ', '.join(choices)))
+        return values
+    return parse
+
+def parseFormats(value):
+    """The output formats of a comma separated list, see writers."""
+    return parseChoiceList(writers)(value)
+
+# keys config.ini needs, with the parser checking their value
+configSchema = {
+    'General': {'month': parseInt, 'year': parseInt, 'country_cc': str, 'subdivision': str, 'max_consec_shifts': parseInt,
+                'overtime_modifier': parseNumber, 'force_pref_free': parseFlag, 'nightshift_last_month': str},
+    'Constraints': dict.fromkeys(['one_empl_per_period', 'one_shift_per_day', 'free_weekend', 'not_two_consec_nights',
+                                  'respect_worktime', 'assure_free_days', 'respect_following_employee', 'respect_pref_free',
+                                  'respect_no_single_dayshift', 'max_n_days_consec_shifts', 'max_two_consec_dayshifts'], parseFlag),
+    'Shift_worktimes': dict.fromkeys(['dayShiftHours', 'nightShiftHoursWeekend', 'nightShiftHoursN', 'nightShiftHoursHWK',
+                                      'nightShiftHoursNPlusD', 'nightShiftHoursWNPlusD', 'team_meeting_time'], parseNumber),
+    'Other_dates': dict.fromkeys(['team_meetings', 'no_dayshift', 'replace_hwk_with_n'], parseDayList),
+}
+# optional [General] keys, checked if given
+optionalGeneral = {'months': parseInt, 'overlap_days': parseInt, 'minimal_change_weight': parseInt, 'pool_size': parseInt,
+                   'pool_min_distance': parseInt, 'pool_tolerance': parseNumber, 'lns_moves': parseInt,
+                   'stream_solutions': parseFlag, 'symmetry_breaking': parseFlag, 'decompose': parseFlag, 'lns': parseFlag,
+                   'horizon_mode': parseChoice(['joint', 'rolling']), 'sequence_encoding': parseChoice(['linear', 'table']),
+                   'lns_neighbourhoods': parseChoiceList(lns.neighbourhoods), 'output_formats': parseFormats}
+# optional [Shift_worktimes] keys
+optionalShiftWorktimes = dict.fromkeys([k for (k, default) in lastMonthHoursKeys.values()] + ['nightShiftHoursPlusDTeamMeeting'], parseNumber)
+# optional [Objective] keys
+objectiveSchema = dict(dict.fromkeys(defaultObjectiveWeights, parseInt), mode=parseChoice(['weighted', 'lexicographic']),
+                       priority=parseChoiceList(objectiveTerms))
 
 def main():
-    print('Check configs...')
-    checkConfigs()
+    args = parseArgs()
 
-    # Creates the model.
-    model = cp_model.CpModel()
+    if args.batch:
+        runBatch(args)
+        return
 
-    employee_file = open(employeeFile, newline='')
-    workerReader = csv.DictReader(employee_file)
-    global workerColumns
-    workerColumns = defaultdict(list)
+    configPath = args.config or configFile
+    employeePath = args.employees or employeeFile
+    if configPath == configFile and employeePath == employeeFile:
+        print('Check configs...')
+        checkConfigs(not args.headless)
 
-    for row in workerReader:
-        for (k,v) in row.items():
-            workerColumns[k].append(v)
+    invalid = False
+    try:
+        # the config and employee file are part of the first model's parse phase
+        metrics = Metrics()
+        metrics.start('parse')
+        config = readConfig(configPath)
+        problems = inputProblems(config, configPath, employeePath) + argumentProblems(args)
+        if problems:
+            raise InvalidInput(problems)
+        solveScenario(config, args, employeePath, metrics)
+    except InvalidInput as e:
+        invalid = True
+        print('Invalid input:')
+        for problem in e.problems:
+            print('  %s' % problem)
 
+    print("Shift calculator %s by Fabian During" % version)
+    if not args.headless:
+        print('')
+        print("Press enter to close")
+        input()
+    if invalid:
+        sys.exit(1)
+
+def loadConfig(path):
+    """Reads the config of path, see readConfig.
+
+    Raises InvalidInput with every missing key and invalid value.
+    """
+    config = readConfig(path)
+    problems = validateConfig(config)
+    if problems:
+        raise InvalidInput(['%s: %s' % (path, p) for p in problems])
+    return config
+
+def readConfig(path):
+    """Reads config.ini, or the same sections as one object of a .json or
+    .yaml file (needs PyYAML) where flags may be booleans and day lists lists,
+    without checking its values (see validateConfig).
+    """
     config = configparser.ConfigParser()
-    config.sections()
-    with open(configFile) as f:
-        config.read_file(f)
+    if path.endswith(('.json', '.yaml', '.yml')):
+        with open(path) as f:
+            if path.endswith('.json'):
+                data = json.load(f)
+            else:
+                import yaml
+                data = yaml.safe_load(f)
+        if not isinstance(data, dict) or not all(isinstance(keys, dict) for keys in data.values()):
+            raise InvalidInput(['%s: expected an object of sections' % path])
+        config.read_dict({section: {k: configValue(v) for (k, v) in keys.items()} for (section, keys) in data.items()})
+    else:
+        with open(path) as f:
+            config.read_file(f)
+    if config.has_section('Solver'):
+        for k in config['Solver']:
+            if k not in solverParameterTypes:
+                print('Warning: unknown solver parameter %s in %s' % (k, path))
+    return config
+
+def inputProblems(config, configPath, employeePath):
+    """Every problem of the config and the employee file, both checked in one go."""
+    problems = ['%s: %s' % (configPath, p) for p in validateConfig(config)]
+    try:
+        monthStart = configuredMonth(config)
+    except (KeyError, ValueError):
+        # already a config problem, only day numbers can be checked
+        monthStart = None
+    try:
+        EmployeeTable.load(employeePath, monthStart)
+    except InvalidInput as e:
+        problems += e.problems
+    return problems
+
+def argumentProblems(args):
+    """Invalid values of command line options which are only checked when used."""
+    problems = []
+    if args.formats:
+        try:
+            parseFormats(args.formats)
+        except ValueError as e:
+            problems.append('--formats: %s' % e)
+    return problems
+
+def configValue(value):
+    """A value of a JSON/YAML config as config.ini text."""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v) for v in value)
+    return str(value)
+
+def validateConfig(config):
+    """Missing sections and keys and invalid values of config, all at once."""
+    problems = []
+    checks = [(section, keys, True) for (section, keys) in configSchema.items()]
+    checks.append(('General', optionalGeneral, False))
+    checks.append(('Shift_worktimes', optionalShiftWorktimes, False))
+    checks.append(('Solver', {k: parseInt if t is int else parseNumber for (k, t) in solverParameterTypes.items()}, False))
+    checks.append(('Objective', objectiveSchema, False))
+    for (section, keys, required) in checks:
+        if not config.has_section(section):
+            if required:
+                problems.append('section [%s] is missing' % section)
+            continue
+        for (key, parse) in keys.items():
+            if key not in config[section]:
+                if required:
+                    problems.append('[%s] %s is missing' % (section, key))
+                continue
+            value = config[section][key]
+            if not required and not value.strip():
+                continue
+            try:
+                parse(value)
+            except ValueError as e:
+                problems.append('[%s] %s: %s' % (section, key, e))
+    # month and year together, if each is a number
+    try:
+        parseInt(config['General']['month'])
+        parseInt(config['General']['year'])
+    except (KeyError, ValueError):
+        return problems
+    try:
+        configuredMonth(config)
+    except ValueError as e:
+        problems.append('[General] month/year: %s' % e)
+    return problems
+
+def solveScenario(config, args, employeePath, metrics=None):
+    """Plans the horizon of config from the command line. Returns one result dict per solved model.
 
+    metrics are those of the first model if its parse phase started before
+    config was read.
+    """
     print('Parse config...')
 
-    global month
-    month = int(config["General"]["month"])
+    months = args.months or int(config["General"].get("months", "1"))
+    rolling = args.rolling or config["General"].get("horizon_mode", "joint") == 'rolling'
+    overlap_days = int(config["General"].get("overlap_days", "7"))
+    # unknown formats fail before solving
+    outputFormats(config, args)
+
+    previousFile = args.previous or config["General"].get("previous_schedule", "")
+    previous = loadSchedule(previousFile) if previousFile else None
+    if args.min_change is not None:
+        changeWeight = args.min_change
+    else:
+        changeWeight = int(config["General"].get("minimal_change_weight", "0"))
+
+    if rolling and months > 1 and not args.check and not args.what_if:
+        return solveRolling(config, args, employeePath, months, overlap_days, previous, changeWeight, metrics)
+    else:
+        if metrics is None:
+            metrics = Metrics()
+            metrics.start('parse')
+        employees = EmployeeTable.load(employeePath, configuredMonth(config))
+        try:
+            schedule = buildModel(config, employees, months, previous, changeWeight, metrics, gated=bool(args.what_if))
+        except InfeasibleInput as e:
+            return [infeasibleInputResult(configuredMonth(config), e)]
+        if args.check:
+            return [checkSchedule(schedule, config, args)]
+        if args.what_if:
+            return solveWhatIf(schedule, config, args, [f.strip() for f in args.what_if.split(',') if f.strip()])
+        nights = None
+        if decompose(config, args):
+            nights = buildModel(config, employees, months, previous, changeWeight, Metrics(), nightsOnly=True)
+        poolSize = args.pool or int(config["General"].get("pool_size", "1"))
+        if poolSize > 1:
+            return solvePoolAndRender(schedule, config, args, poolSize)
+        return [solveResult(solveAndRender(schedule, config, args, nights))]
+
+def decompose(config, args):
+    """True if the nights and days are solved one after another (--decompose)."""
+    return args.decompose or config["General"].get("decompose", "False") == 'True'
+
+# Library API: buildModel() -> Schedule, solve() -> Solution, render(). None of
+# it reads module state, so models can be cached and solved several times.
+
+def configuredMonth(config):
+    """First day of the month configured in [General]."""
+    return datetime.date(int(config["General"]["year"]), int(config["General"]["month"]), 1)
+
+def buildModel(config, employees, months=1, previous=None, changeWeight=0, metrics=None, gated=False, nightsOnly=False):
+    """Builds the model of the configured month and the months-1 following ones.
+
+    employees is an EmployeeTable loaded for the configured month,
+    e.g. EmployeeTable.load(path, configuredMonth(config)). See
+    buildSchedule for gated and nightsOnly.
+    """
+    start = configuredMonth(config)
+    calendarTable = calendarFor(config, start, horizonDays(start, months), publicHolidays=gated or None)
+    return buildSchedule(config, calendarTable, employees, firstNights(config, calendarTable),
+                         previous=previous, changeWeight=changeWeight, metrics=metrics, gated=gated, nightsOnly=nightsOnly)
+
+def firstNights(config, calendarTable):
+    """The night shift nightshift_last_month took into day 1, as lastNights of buildSchedule."""
+    name = config["General"]["nightshift_last_month"]
+    if name == "":
+        return {}
+    return {name: str(calendarTable.night[0])}
+
+class Solution:
+    """Result of solve(): the solver with its status and the assigned shifts."""
+
+    def __init__(self, schedule, solver, status):
+        self.schedule = schedule
+        self.solver = solver
+        self.status = status
+        self.statusName = solver.StatusName(status)
+        self.feasible = solved(status)
+        self.objective = solver.ObjectiveValue() if self.feasible else None
+        self.bound = solver.BestObjectiveBound() if self.feasible else None
+        # stage the solver minimized (objective and bound are its values), see solve()
+        self.objectiveName = schedule.objectives[0][0] if schedule.objectives else None
+        # (name, value) of every stage of a lexicographic objective
+        self.stages = []
+        if self.feasible and len(schedule.objectives) > 1:
+            self.stages = [(name, solver.Value(expr)) for (name, expr) in schedule.objectives]
+        self.wallTime = solver.WallTime()
+        # (name, date, shift) of the planned days
+        self.assignments = []
+        if self.feasible:
+            cal = schedule.cal
+            values = solutionValues(solver, schedule.shifts.values())
+            self.assignments = [(n, cal.dates[d], s) for ((n, d, s), value) in zip(schedule.shifts, values)
+                                if d in cal.planned and value == 1]
+
+def solve(schedule, params={}, callback=None, flags=None):
+    """Solves schedule with the given CP-SAT parameters, e.g. {'max_time_in_seconds': 60}.
+
+    flags ({flag: bool} of toggleFlags) switch constraint families of a
+    gated schedule on or off for this solve, the others keep their value
+    of config.ini.
+
+    Lexicographic objectives are solved stage by stage on a copy of the
+    model, each stage with an equal share of the time limit. The value a
+    stage reached is kept as a bound for the following stages, and its
+    solution is their hint. The Solution of the last solved stage is
+    returned.
+    """
+    model = schedule.model
+    if flags:
+        if not schedule.gates:
+            raise ValueError('flags need a schedule built with gated=True')
+        model = model.Clone()
+        model.ClearAssumptions()
+        model.AddAssumptions(flagAssumptions(schedule.gates, dict(schedule.flags, **flags)))
+    if len(schedule.objectives) <= 1:
+        return solveModel(schedule, model, params, callback, 'solve')
+
+    model = model.Clone()
+    stageParams = dict(params)
+    if 'max_time_in_seconds' in params:
+        stageParams['max_time_in_seconds'] = params['max_time_in_seconds'] / len(schedule.objectives)
+    solution = None
+    for (name, expr) in schedule.objectives:
+        model.Minimize(expr)
+        stage = solveModel(schedule, model, stageParams, callback, 'solve_' + name)
+        stage.objectiveName = name
+        if not stage.feasible:
+            break
+        print('  %s: %i (%s)' % (name, stage.objective, stage.statusName))
+        solution = stage
+        model.Add(expr <= int(stage.objective))
+        model.ClearHints()
+        for var in schedule.shifts.values():
+            model.AddHint(var, stage.solver.BooleanValue(var))
+    return solution or stage
+
+def solveMatrix(schedule, flagSets, params={}, jobs=None):
+    """Solves a gated schedule once per {flag: bool} dict of flagSets, jobs
+    of them at once. Returns the Solutions in the order of flagSets."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        return list(pool.map(solveVariant, itertools.repeat(schedule), flagSets, itertools.repeat(params)))
+
+def solveVariant(schedule, flags, params):
+    # every thread records its own metrics
+    variant = copy.copy(schedule)
+    variant.metrics = Metrics()
+    return solve(variant, params, flags=flags)
+
+def solveDecomposed(schedule, nights, params={}, moves=20, neighbourhoods=None):
+    """Solves a large schedule in steps instead of one model.
+
+    nights is the same input built with nightsOnly. Its night shifts and
+    rest rules are solved first. Then schedule plans the day shifts and
+    balances the worktime with these nights fixed (only hinted if that has
+    no solution). At last moves LNS moves of the given neighbourhoods
+    improve it, see lns.improve. The two models get a quarter of
+    max_time_in_seconds each, the moves share the other half. Only the first
+    objective stage is minimized.
+    """
+    timeLimit = params.get('max_time_in_seconds')
+    stepParams = dict(params)
+    if timeLimit:
+        stepParams['max_time_in_seconds'] = timeLimit / 4
+    print('Solve the night shifts...')
+    first = solveModel(nights, nights.model, stepParams, None, 'solve_nights')
+    if not first.feasible:
+        return first
+    nightValues = {k: int(first.solver.BooleanValue(var)) for (k, var) in nights.shifts.items()}
+
+    print('Solve the day shifts...')
+    model = schedule.model.Clone()
+    model.ClearHints()
+    for (k, value) in nightValues.items():
+        model.Add(schedule.shifts[k] == value)
+    solution = solveModel(schedule, model, stepParams, None, 'solve_days')
+    if not solution.feasible:
+        print('The nights leave no room for the day shifts, solve both again...')
+        model = schedule.model.Clone()
+        model.ClearHints()
+        for (k, value) in nightValues.items():
+            model.AddHint(schedule.shifts[k], value)
+        solution = solveModel(schedule, model, stepParams, None, 'solve_days')
+        if not solution.feasible:
+            return solution
+
+    moveParams = dict(params)
+    if timeLimit:
+        moveParams['max_time_in_seconds'] = timeLimit / 2 / max(1, moves)
+    schedule.metrics.start('lns')
+    solver = lns.improve(schedule, solution.solver, moveParams, moves, neighbourhoods, params.get('random_seed', 1))
+    schedule.metrics.stop()
+    # optimal for the last step at best, without a bound of the whole model
+    solution = Solution(schedule, solver, cp_model.FEASIBLE)
+    solution.bound = None
+    return solution
+
+def solveLns(schedule, params={}, moves=20, neighbourhoods=None):
+    """Solves schedule with half of max_time_in_seconds, then improves the
+    solution by moves LNS moves of the given neighbourhoods (names of
+    lns.neighbourhoods, default all) sharing the other half."""
+    timeLimit = params.get('max_time_in_seconds')
+    stepParams = dict(params)
+    if timeLimit:
+        stepParams['max_time_in_seconds'] = timeLimit / 2
+    solution = solveModel(schedule, schedule.model, stepParams, None, 'solve')
+    if not solution.feasible or solution.status == cp_model.OPTIMAL:
+        return solution
+
+    moveParams = dict(params)
+    if timeLimit:
+        moveParams['max_time_in_seconds'] = timeLimit / 2 / max(1, moves)
+    schedule.metrics.start('lns')
+    solver = lns.improve(schedule, solution.solver, moveParams, moves, neighbourhoods, params.get('random_seed', 1))
+    schedule.metrics.stop()
+    if solver is solution.solver:
+        return solution
+    solution = Solution(schedule, solver, cp_model.FEASIBLE)
+    solution.bound = None
+    return solution
+
+def solveModel(schedule, model, params, callback, phase):
+    solver = cp_model.CpSolver()
+    for (k, v) in params.items():
+        setattr(solver.parameters, k, v)
+    schedule.metrics.start(phase)
+    status = solver.Solve(model, callback)
+    schedule.metrics.stop()
+    schedule.metrics.addSolver(solver, status)
+    return Solution(schedule, solver, status)
+
+def solvePool(schedule, size, params={}, tolerance=0.0, minDistance=1):
+    """Up to size distinct Solutions of schedule, starting with a plain solve.
+
+    The alternatives are solved on a copy of the model, with every objective
+    stage fixed to at most tolerance (relative) above the first solution and at
+    least minDistance planned shifts different from every earlier solution.
+    """
+    first = solve(schedule, params)
+    pool = [first]
+    if not first.feasible:
+        return pool
+
+    model = schedule.model.Clone()
+    for (name, expr) in schedule.objectives:
+        best = first.solver.Value(expr)
+        model.Add(expr <= best + int(abs(best) * tolerance))
+
+    keys = [k for k in schedule.shifts if k[1] in schedule.cal.planned]
+    literals = [model.GetBoolVarFromProtoIndex(schedule.shifts[k].Index()) for k in keys]
+    solution = first
+    while len(pool) < size:
+        # no-good cut: differ from this solution in at least minDistance shifts
+        values = [solution.solver.BooleanValue(schedule.shifts[k]) for k in keys]
+        model.Add(sum((1 - x) if v else x for (x, v) in zip(literals, values)) >= minDistance)
+
+        solution = solveModel(schedule, model, params, None, 'solve_pool_%i' % (len(pool) + 1))
+        if not solution.feasible:
+            break
+        pool.append(solution)
+    return pool
+
+def render(solution, format='pdf', openFile=False):
+    """Writes a feasible solution in one of the formats of writers, e.g.
+    shifts-month-year.pdf ('pdf') or .csv ('csv')."""
+    if format not in writers:
+        raise ValueError('unknown format %s, choose from %s' % (format, ', '.join(writers)))
+    solution.schedule.metrics.start('render_%s' % format)
+    writers[format](solution, openFile=openFile)
+    solution.schedule.metrics.stop()
+
+def outputFormats(config, args):
+    """The formats to render (--formats or General output_formats, default pdf and csv)."""
+    problems = argumentProblems(args)
+    if problems:
+        raise InvalidInput(problems)
+    return parseFormats(args.formats or config["General"].get("output_formats", "pdf, csv"))
+
+def runBatch(args):
+    """Solves every scenario below args.batch in a process pool.
+
+    A scenario is a directory with a config.ini and an employee.csv. Its
+    output files and log go to a directory of the same name below
+    args.output, and summary.csv there lists the result of every solved model.
+    """
+    names = sorted(n for n in os.listdir(args.batch)
+                   if os.path.isfile(os.path.join(args.batch, n, configFile))
+                   and os.path.isfile(os.path.join(args.batch, n, employeeFile)))
+    if not names:
+        print('No scenarios (directories with %s and %s) found in %s' % (configFile, employeeFile, args.batch))
+        return
+    jobs = min(args.jobs or os.cpu_count(), len(names))
+    if args.num_workers is None:
+        # share the cores between the processes
+        args.num_workers = max(1, os.cpu_count() // jobs)
+    print('Solving %i scenarios in %i processes with %i solver workers each...' % (len(names), jobs, args.num_workers))
+
+    args.headless = True
+    if args.previous:
+        args.previous = os.path.abspath(args.previous)
+    os.makedirs(args.output, exist_ok=True)
+    rows = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(runScenario, os.path.abspath(os.path.join(args.batch, n)),
+                               os.path.abspath(os.path.join(args.output, n)), args): n for n in names}
+        for future in concurrent.futures.as_completed(futures):
+            n = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [{'period': '', 'status': 'ERROR: %s' % e, 'objective': '', 'best_bound': '', 'wall_time': ''}]
+            for r in results:
+                print('  %s %s: %s' % (n, r['period'], r['status']))
+                rows.append(dict(scenario=n, **r))
+
+    rows.sort(key=lambda r: r['scenario'])
+    summaryFile = os.path.join(args.output, 'summary.csv')
+    with open(summaryFile, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['scenario', 'period', 'status', 'objective', 'best_bound', 'wall_time'])
+        writer.writeheader()
+        writer.writerows(rows)
+    print('Summary written to %s' % summaryFile)
+
+def runScenario(scenarioDir, outputDir, args):
+    """Solves one batch scenario in the current (worker) process, writing into outputDir."""
+    metrics = Metrics()
+    metrics.start('parse')
+    config = loadConfig(os.path.join(scenarioDir, configFile))
+    os.makedirs(outputDir, exist_ok=True)
+    os.chdir(outputDir)
+    with open('scheduler.log', 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        return solveScenario(config, args, os.path.join(scenarioDir, employeeFile), metrics)
+
+def solveRolling(config, args, employeePath, months, overlap_days, previous=None, changeWeight=0, firstMetrics=None):
+    """Plans the months one after another.
+
+    Each window re-plans one month. The last overlap_days days of the
+    previous month are part of the window with their shifts fixed to the
+    previous solution, so rest rules and consecutive day counters continue
+    across the month boundary. The night shift trailing into the window and
+    each employee's overtime are carried over from the previous solution too.
+    firstMetrics are the metrics of the first window, see solveScenario.
+    """
+    lastNights = {}
+    fixed = set()
+    overtime = {}
+    streaks = {}
+    results = []
+    start = configuredMonth(config)
+    monthStart = start
+    overlap = 0
+    for i in range(months):
+        print('Plan %s %i...' % (calendar.month_name[monthStart.month], monthStart.year))
+        metrics = firstMetrics if i == 0 and firstMetrics is not None else Metrics()
+        if metrics.current is None:
+            metrics.start('parse')
+        windowStart = monthStart - datetime.timedelta(days=overlap)
+        numDays = overlap + calendar.monthrange(monthStart.year, monthStart.month)[1]
+        calendarTable = calendarFor(config, windowStart, numDays, firstDay=overlap + 1)
+        if i == 0:
+            lastNights = firstNights(config, calendarTable)
+
+        employeeTable = EmployeeTable.load(employeePath, start, windowStart)
+        for (n, ot) in overtime.items():
+            if n in employeeTable:
+                employeeTable[n].overtime = ot
+
+        try:
+            schedule = buildSchedule(config, calendarTable, employeeTable, lastNights, fixed, previous, changeWeight, metrics, streaks)
+        except InfeasibleInput as e:
+            results.append(infeasibleInputResult(monthStart, e))
+            print('Stopped planning after %s %i.' % (calendar.month_name[monthStart.month], monthStart.year))
+            return results
+        nights = None
+        if decompose(config, args):
+            nights = buildSchedule(config, calendarTable, employeeTable, lastNights, fixed, previous, changeWeight, Metrics(), streaks, nightsOnly=True)
+        solution = solveAndRender(schedule, config, args, nights)
+        results.append(solveResult(solution))
+        if not solution.feasible:
+            print('Stopped planning after %s %i.' % (calendar.month_name[monthStart.month], monthStart.year))
+            return results
+
+        nextMonth = monthStart + datetime.timedelta(days=numDays - overlap)
+        overlap = min(overlap_days, numDays - overlap)
+        lastNights, fixed, overtime, streaks = carryOver(schedule, solution.solver, nextMonth - datetime.timedelta(days=overlap))
+        monthStart = nextMonth
+    return results
+
+def carryOver(schedule, solver, nextStart):
+    """State the next window starting at nextStart takes over from a solved schedule.
+
+    Returns the night shifts started the day before nextStart, the
+    (name, date, shift) assignments from nextStart on, the new overtime
+    of each employee in hours and the (worked days, day shifts) in a row
+    each employee has right before nextStart.
+    """
+    cal = schedule.cal
+    lastNights = {}
+    fixed = set()
+    worked = set()
+    for ((n, d, s), value) in zip(schedule.shifts, solutionValues(solver, schedule.shifts.values())):
+        if value == 1:
+            worked.add((n, d, s))
+            if cal.dates[d] >= nextStart:
+                fixed.add((n, cal.dates[d], s))
+            elif cal.dates[d] == nextStart - datetime.timedelta(days=1) and s != 'd':
+                lastNights[n] = s
+    overtime = {}
+    for (n, (minutes, target)) in worktimeResults(schedule, solver).items():
+        overtime[n] = schedule.employees[n].overtime + (minutes - target) / 60
+
+    streaks = {}
+    last = (nextStart - cal.start).days
+    for n in schedule.employees.names:
+        def busy(d):
+            return (n, d, 'd') in worked or (n, d, str(cal.night[d])) in worked or (n, d-1, str(cal.night[d-1])) in worked
+        days = 0
+        while last - days >= 1 and busy(last - days):
+            days += 1
+        dayShifts = 0
+        while last - dayShifts >= 1 and (n, last - dayShifts, 'd') in worked:
+            dayShifts += 1
+        streaks[n] = (days, dayShifts)
+    return lastNights, fixed, overtime, streaks
+
+def loadSchedule(path):
+    """Reads a schedule written by this tool as a set of (name, date, shift).
+
+    Takes the shifts-month-year.csv or .jsonl of a solved run as well as the
+    -solutions.csv and -solutions.jsonl streams, of which the last
+    solution is used.
+    """
+    if path.endswith('.jsonl'):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        # a stream of solutions, else one shift per line
+        if rows and "shifts" in rows[-1]:
+            rows = rows[-1]["shifts"]
+    else:
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        if rows and "solution" in rows[0]:
+            last = rows[-1]["solution"]
+            rows = [r for r in rows if r["solution"] == last]
+    return {(r["employee"], datetime.date.fromisoformat(r["date"]), r["shift"]) for r in rows}
+
+def horizonDays(start, months):
+    numDays = 0
+    for i in range(months):
+        y, m = divmod(start.month - 1 + i, 12)
+        numDays += calendar.monthrange(start.year + y, m + 1)[1]
+    return numDays
+
+def calendarFor(config, start, numDays, firstDay=1, publicHolidays=None):
+    # days in [Other_dates] are days of the configured month, like in employee.csv
+    dayNumber = DayNumbers(configuredMonth(config), start)
+    # public holidays only count for assure_free_days
+    if publicHolidays is None:
+        publicHolidays = config["Constraints"]["assure_free_days"] == 'True'
+    holidayCalendar = None
+    if publicHolidays:
+        import holidays
+        holidayCalendar = holidays.country_holidays(config["General"]["country_cc"], subdiv=config["General"]["subdivision"])
+    return CalendarTable(start, numDays,
+                         holidayCalendar=holidayCalendar,
+                         teamMeetings=parseDays(config["Other_dates"]["team_meetings"], dayNumber),
+                         noDayshift=parseDays(config["Other_dates"]["no_dayshift"], dayNumber),
+                         replaceHwkWithN=parseDays(config["Other_dates"]["replace_hwk_with_n"], dayNumber),
+                         firstDay=firstDay)
+
+class Schedule:
+    """A built model together with what is needed to print its solution."""
+
+    def __init__(self, model, cal, employees, lastNights, shifts, worktimes_per_worker, all_weekends, all_emp_free_days, free_days_count, metrics, objectives=(), families={}, freeDays={}):
+        self.model = model
+        self.cal = cal
+        self.employees = employees
+        self.lastNights = lastNights
+        self.shifts = shifts
+        self.worktimes_per_worker = worktimes_per_worker
+        self.all_weekends = all_weekends
+        self.all_emp_free_days = all_emp_free_days
+        self.free_days_count = free_days_count
+        self.metrics = metrics
+        # (name, expr) stages minimized one after another, see objectiveStages
+        self.objectives = list(objectives)
+        # constraint index range of each constraint family (phase of buildSchedule)
+        self.families = families
+        self.freeDays = freeDays
+        # {flag: literal} of a gated schedule, and the toggleFlags of config.ini
+        self.gates = {}
+        self.flags = {}
+
+def buildSchedule(config, calendarTable, employeeTable, lastNights={}, fixed=(), previous=None, changeWeight=0, metrics=None, streaks={}, gated=False, nightsOnly=False):
+    """Builds the model for all days of calendarTable.
+
+    lastNights maps employees to the night shift they took from the day
+    before the horizon into day 1. fixed holds the (name, date, shift)
+    assignments of the carried over days before calendarTable.firstDay.
+    previous is a (name, date, shift) set of an earlier schedule: it is
+    used as solution hint, and with a changeWeight every shift that differs
+    from it costs changeWeight in the objective (the minimal_change weight,
+    see objectiveWeights). The time and model size
+    of each constraint family go to metrics (a new Metrics by default).
+    streaks maps employees to the (worked days, day shifts) in a row they
+    ended the previous period with, see carryOver.
+    A gated schedule puts the constraint family of each flag of toggleFlags
+    behind an enforcement literal (schedule.gates), so that solve() can
+    switch them on and off by assumptions without rebuilding the model.
+    nightsOnly leaves out the day shifts, see solveDecomposed.
+    """
+    employees = employeeTable
+    cal = calendarTable
+    if metrics is None:
+        metrics = Metrics()
+
+    metrics.start('precheck')
+    # the full model of a decomposition checks the input
+    errors, warnings = precheck(config, cal, employees, lastNights) if not nightsOnly else ([], [])
+    for w in warnings:
+        print('Warning: %s' % w)
+    if errors:
+        raise InfeasibleInput(errors)
 
-    global year
-    year = int(config["General"]["year"])
+    # Creates the model.
+    model = cp_model.CpModel()
+    # constraint indices of each constraint family, see feasibility.explain
+    families = {}
+    def family(name):
+        metrics.start(name, model)
+        families[name] = len(model.Proto().constraints)
 
-    country_cc = config["General"]["country_cc"]
-    subdivision = config["General"]["subdivision"]
     max_consec_shifts =  int(config["General"]["max_consec_shifts"]) + 1
     overtime_modifier = float(config["General"]["overtime_modifier"])
     
-    one_empl_per_period = config["Constraints"]["one_empl_per_period"] == 'True'
-    one_shift_per_day = config["Constraints"]["one_shift_per_day"]  == 'True'
-    free_weekend = config["Constraints"]["free_weekend"]  == 'True'
+    # a gated schedule has every family of toggleFlags, config.ini only
+    # decides which of them are on
+    flags = {f: config["Constraints"][f] == 'True' for f in toggleFlags}
+    one_empl_per_period = flags['one_empl_per_period'] or gated
+    one_shift_per_day = flags['one_shift_per_day'] or gated
+    free_weekend = flags['free_weekend'] or gated
     not_two_consec_nights = config["Constraints"]["not_two_consec_nights"]  == 'True'
     respect_worktime = config["Constraints"]["respect_worktime"]  == 'True'
-    assure_free_days = config["Constraints"]["assure_free_days"]  == 'True'
-    respect_following_employee = config["Constraints"]["respect_following_employee"]  == 'True'
-    respect_no_single_dayshift = config["Constraints"]["respect_no_single_dayshift"]  == 'True'
-    max_n_days_consec_shifts = config["Constraints"]["max_n_days_consec_shifts"]  == 'True'
+    assure_free_days = flags['assure_free_days'] or gated
+    respect_following_employee = flags['respect_following_employee'] or gated
+    respect_no_single_dayshift = flags['respect_no_single_dayshift'] or gated
+    max_n_days_consec_shifts = flags['max_n_days_consec_shifts'] or gated
     respect_pref_free = config["Constraints"]["respect_pref_free"]  == 'True'
-    max_two_consec_dayshifts = config["Constraints"]["max_two_consec_dayshifts"]  == 'True'
+    max_two_consec_dayshifts = flags['max_two_consec_dayshifts'] or gated
     force_pref_free = config["General"]["force_pref_free"]  == 'True'
-    
-    global nightshift_last_month
-    nightshift_last_month = config["General"]["nightshift_last_month"]
-
-    ttt = config["Other_dates"]["team_meetings"]
-    team_meetings = ttt.split(',')
-
-    ttt2 = config["Other_dates"]["no_dayshift"]
-    no_dayshift = ttt2.split(',')
-
-    ttt3 = config["Other_dates"]["replace_hwk_with_n"]
-    replace_hwk_with_n = ttt3.split(',')
+    sequence_encoding = config["General"].get("sequence_encoding", "table")
+    symmetry_breaking = config["General"].get("symmetry_breaking", "True") == 'True'
 
     shifts = {}
     allShifts = ['d', 'n','wn', 'nhwk']
-    allEmployees = workerColumns['name']
-    all_days = range(1, calendar.monthrange(year, month)[1]+1)
+    allEmployees = employees.names
+    all_days = cal.days
     dayShiftHours = int(float(config["Shift_worktimes"]["dayShiftHours"]) * 60)
     nightShiftHoursWeekend = int(float(config["Shift_worktimes"]["nightShiftHoursWeekend"]) * 60)
     nightShiftHoursN = int(float(config["Shift_worktimes"]["nightShiftHoursN"]) * 60)
@@ -118,66 +871,74 @@ def main():
     nightShiftHoursNPlusD = int(float(config["Shift_worktimes"]["nightShiftHoursNPlusD"]) * 60)
     team_meeting_time = int(float(config["Shift_worktimes"]["team_meeting_time"]) * 60)
     nightShiftHoursWNPlusD = int(float(config["Shift_worktimes"]["nightShiftHoursWNPlusD"]) * 60)
+    nightShiftMinutes = {'n': nightShiftHoursN, 'nhwk': nightShiftHoursHWK, 'wn': nightShiftHoursWeekend}
+    doubleShiftMinutes = {'n': nightShiftHoursNPlusD, 'nhwk': nightShiftHoursNPlusD, 'wn': nightShiftHoursWNPlusD}
+    # a double shift ending on a team meeting day, counted as any other double shift if not given
+    doubleShiftTeamMeetingMinutes = None
+    if config["Shift_worktimes"].get("nightShiftHoursPlusDTeamMeeting", "").strip():
+        doubleShiftTeamMeetingMinutes = int(float(config["Shift_worktimes"]["nightShiftHoursPlusDTeamMeeting"]) * 60)
+    lastMonthNightMinutes = {s: int(float(config["Shift_worktimes"].get(k, default)) * 60) for (s, (k, default)) in lastMonthHoursKeys.items()}
 
     worktimes_per_worker = {}
     worktimes_per_worker_week = {}
+    # objective terms by name, all of them minimized
+    terms = {}
+    missedPrefFrees = []
 
+    family('domain')
     print('Apply possible shifts...')
     #add all possible results
     #search domain
+    for e in employees:
+        worktimes_per_worker[e.name] = []
+        worktimes_per_worker_week[e.name] = []
+
     for d in all_days:
-        date = datetime.date(year, month, d)
-        weekday = date.weekday()
-        for n in workerColumns['name']:
-            worktimes_per_worker[n] = []
-            worktimes_per_worker_week[n] = []
+        night = str(cal.night[d])
+        for e in employees:
+            n = e.name
 
             # if employee is not on vacation
-            if not onVacation(n,d):
-                if doesShift(n,'d') and not str(d) in no_dayshift:
+            if not d in e.vacation:
+                if 'd' in e.available and not cal.no_dayshift[d] and not nightsOnly:
                     shifts[(n, d, 'd')] = model.NewBoolVar('shift_%s_%s_%s' % (n, d, 'd'))
-                if weekday == 1 or weekday == 0:
-                    if doesShift(n,'n') and not onVacation(n,d+1):
-                        shifts[(n, d, 'n')] = model.NewBoolVar('shift_%s_%s_%s' % (n, d, 'n'))
-                elif weekday == 3 or weekday == 2 or weekday == 6:
-                    if doesShift(n,'nhwk') and not onVacation(n,d+1):
-                        shifts[(n, d, 'nhwk')] = model.NewBoolVar('shift_%s_%s_%s' % (n, d, 'nhwk'))
-                else:
-                    if doesShift(n,'wn') and not onVacation(n,d+1):
-                        shifts[(n, d, 'wn')] = model.NewBoolVar('shift_%s_%s_%s' % (n, d, 'wn'))
-                            
-    #all reqired minutes
-    reqMinutes = 0
+                if night in e.available and not d+1 in e.vacation:
+                    shifts[(n, d, night)] = model.NewBoolVar('shift_%s_%s_%s' % (n, d, night))
+
+    #fix the days carried over from the previous period
+    for ((n, d, s), var) in shifts.items():
+        if d < cal.firstDay:
+            model.Add(var == int((n, cal.dates[d], s) in fixed))
 
     print('Apply constraints...')
     
     champs = []
-    for n in workerColumns['name']:
-        if canBeSingle(n):
+    for n in allEmployees:
+        if employees[n].can_be_single:
             champs.append(n)
 
 
+    family('coverage')
     # Each shift is assigned to exactly one employee in the schedule period.
     if one_empl_per_period:
-        for d in all_days:
-            date = datetime.date(year, month, d)
-            weekday = date.weekday()
-
-            if not str(d) in no_dayshift:
+        for d in cal.planned:
+            if not cal.no_dayshift[d] and not nightsOnly:
                 freeEmps = []
                 champs = []
 
 
-                for n in workerColumns['name']:
-                    if not onVacation(n,d) and doesShift(n,allShifts[0]):
-                            freeEmps.append(n)
+                for e in employees:
+                    if not d in e.vacation and allShifts[0] in e.available:
+                            freeEmps.append(e.name)
 
                 can = []
                 for b in freeEmps:
                     can.append(shifts[(b, d, allShifts[0])])
                 
                 i = model.NewBoolVar('champs conquer weekend day %s' % (d))
-                if weekday == 5 or weekday == 6:  
+                if cal.weekend[d]:
+                    # the weekend day shift is optional, but never doubled
+                    model.Add(sum(can) <= 1)
                     for c in champs:
                         if shifts[(c, d, allShifts[1])] or shifts[(c, d, allShifts[2])] or shifts[(c, d, allShifts[3])]: 
                             model.Add(sum(shifts[(c, d, allShifts[1])], shifts[(c, d, allShifts[2])], shifts[(c, d, allShifts[3])]) == 1).OnlyEnforceIf(i == 1)
@@ -185,45 +946,31 @@ def main():
                 else:
                     model.Add(sum(can) == 1)
                     model.Add(i == 0)
-                reqMinutes += dayShiftHours
             
-            if (weekday == 6 or weekday == 2 or weekday == 3) and not d in replace_hwk_with_n:
-                # day and normal night shift
-                freeEmps = []
-                for n in workerColumns['name']:
-                    if not onVacation(n,d) and doesShift(n,allShifts[3]) and not onVacation(n,d+1):
-                        freeEmps.append(n)
-                model.Add(sum(shifts[(a, d, allShifts[3])] for a in freeEmps) == 1)
-                reqMinutes += nightShiftHoursHWK
-            elif weekday == 4 or weekday == 5:
-                # day and weekend night shift
-                freeEmps = []
-                for n in workerColumns['name']:
-                    if not onVacation(n,d) and doesShift(n,allShifts[2]) and not onVacation(n,d+1):
-                        freeEmps.append(n)
-                model.Add(sum(shifts[(a, d, allShifts[2])] for a in freeEmps) == 1)
-                reqMinutes += nightShiftHoursWeekend
-            else:
-                # day and normal night shift
-                freeEmps = []
-                for n in workerColumns['name']:
-                    if not onVacation(n,d) and doesShift(n,allShifts[1]) and not onVacation(n,d+1):
-                        freeEmps.append(n)
-                model.Add(sum(shifts[(a, d, allShifts[1])] for a in freeEmps) == 1)
-                reqMinutes += nightShiftHoursN
+            # night shift of the day (n, nhwk or wn)
+            night = str(cal.night[d])
+            freeEmps = []
+            for e in employees:
+                if not d in e.vacation and night in e.available and not d+1 in e.vacation:
+                    freeEmps.append(e.name)
+            model.Add(sum(shifts[(a, d, night)] for a in freeEmps) == 1)
 
 
+    family('forced_shifts')
     #enter forced shifts
-    for d in all_days:
-        for n in workerColumns['name']:
+    for e in employees:
+        for d in e.forced:
+            if not d in cal.planned:
+                continue
             for s in allShifts:
-                if checkForcedShifts(n,d,s) and (n,d,s) in shifts:
-                    model.Add(shifts[(n,d,s)] == 1)
+                if e.isForced(d,s) and (e.name,d,s) in shifts:
+                    model.Add(shifts[(e.name,d,s)] == 1)
 
+    family('following_employee')
     if respect_following_employee:
         for n in allEmployees:
-            for m in allEmployees:
-                if shouldNotRelief(n, m):
+            for m in employees[n].not_replaced_by:
+                if m in employees:
                     for d in all_days:
                         if (n,d,'d') in shifts and (m,d,'n') in shifts:
                             model.Add(shifts[(m,d,'n')] == 0).OnlyEnforceIf(shifts[(n,d,'d')])
@@ -234,6 +981,7 @@ def main():
                         if (n,d,'d') in shifts and (m,d,'wn') in shifts:
                             model.Add(shifts[(m,d,'wn')] == 0).OnlyEnforceIf(shifts[(n,d,'d')])
             
+    family('one_shift_per_day')
     if one_shift_per_day:
         #only one shift per day
         for n in allEmployees:
@@ -244,51 +992,39 @@ def main():
                             availShifts.append(shifts[(n,d,s)])
                 model.Add(sum(availShifts) <= 1)
 
+    family('free_weekend')
     all_weekends = []
     if free_weekend:
         #free weekend for each employee
         for n in allEmployees:
-            collectedWeekends = []
-            for d in all_days:
-                date = datetime.date(year, month, d)
-                weekday = date.weekday()
-                if weekday == 4 and d+2 < len(all_days):
-
-                    # if friday
-                    i = model.NewBoolVar('%s has free weekend starting at %s' % (n, d))
-                    freeWeekend = []
-                    if (n,d,'wn') in shifts:
-                        freeWeekend.append(shifts[(n,d,'wn')])
-
-                    if (n,d+1,'d') in shifts:
-                        freeWeekend.append(shifts[(n,d+1,'d')])
-
-                    if (n,d+1,'wn') in shifts:
-                        freeWeekend.append(shifts[(n,d+1,'wn')])
-
-                    if (n,d+2,'d') in shifts:
-                        freeWeekend.append(shifts[(n,d+2,'d')])
-
-                    if (n,d+2,'nhwk') in shifts:
-                        freeWeekend.append(shifts[(n,d+2,'nhwk')])
-
-                    model.Add(sum(freeWeekend) == 0).OnlyEnforceIf(i)
-                    collectedWeekends.append(i)
-                    all_weekends.append(i)
-            model.Add(sum(collectedWeekends) >= 1)
-
+            for period in cal.periods():
+                collectedWeekends = []
+                for d in period:
+                    if cal.weekday[d] == 4 and d+2 < len(all_days):
+
+                        # if friday: friday night, saturday and sunday
+                        i = model.NewBoolVar('%s has free weekend starting at %s' % (n, d))
+                        freeWeekend = []
+                        for key in [(n,d,cal.night[d]), (n,d+1,'d'), (n,d+1,cal.night[d+1]), (n,d+2,'d'), (n,d+2,cal.night[d+2])]:
+                            if key in shifts:
+                                freeWeekend.append(shifts[key])
+
+                        model.Add(sum(freeWeekend) == 0).OnlyEnforceIf(i)
+                        collectedWeekends.append(i)
+                        all_weekends.append(i)
+                model.Add(sum(collectedWeekends) >= 1)
+
+    family('free_days')
     free_days_count = 0
     all_emp_free_days = []
+    # day off literal of each (employee, day)
+    freeDays = {}
+    collectedFreeDays = {}
+    prefFreeDays = {}
     if assure_free_days:
-        all_holidays = holidays.country_holidays(country_cc, subdiv=subdivision)
-        for d in all_days:
-            date = datetime.date(year, month, d)
-            #check holiday
-            if date in all_holidays:
-                free_days_count = free_days_count + 1
-            #check weekend
-            elif date.weekday() == 5 or date.weekday() == 6:
-                free_days_count = free_days_count + 1
+        # public holidays and weekend days, the worktime targets follow config.ini
+        if flags['assure_free_days']:
+            free_days_count = cal.freeDaysCount()
 
         for n in allEmployees:
             prefFrees = []
@@ -315,38 +1051,52 @@ def main():
                         tmp.append(shifts[(n,d-1,'nhwk')])
                     else:
                         tmp.append(shifts[(n,d-1,'wn')])
-                #if str(d) in team_meetings and not onVacation(n,d):
+                #if str(d) in team_meetings and not d in employees[n].vacation:
                 #    model.Add(i == 0)
 
-                if d == 1 and nightshift_last_month == n and hasPrefFree(n,d):
+                # the night shift taken over from the previous period ends on day 1
+                if lastMonthShift(lastNights, n, d):
                     model.Add(i == 0)
                 else:
                     model.Add(sum(tmp) == 0).OnlyEnforceIf(i)
-                    if respect_pref_free and hasPrefFree(n,d):
+                    if respect_pref_free and d in employees[n].pref_free and d in cal.planned:
                         prefFrees.append(i)
                 collected_free_days.append(i)
-                all_emp_free_days.append(i)
-            if max_n_days_consec_shifts:
-                for bla in collected_free_days:
-                    sublist = []
-                    b = collected_free_days.index(bla)
-                    sublist = collected_free_days[b:b+max_consec_shifts]
-                    if len(sublist) == max_consec_shifts:
-                        model.Add(sum(sublist) > 0)
-
-            model.Add(sum(collected_free_days) >= free_days_count)
+                freeDays[(n, d)] = i
+                if d in cal.planned:
+                    all_emp_free_days.append(i)
+            collectedFreeDays[n] = collected_free_days
+            prefFreeDays[n] = prefFrees
+
+    family('assure_free_days')
+    if assure_free_days:
+        for (n, prefFrees) in prefFreeDays.items():
+            for period in cal.periods():
+                model.Add(sum(freeDays[(n, d)] for d in period) >= cal.freeDaysCount(period))
             if respect_pref_free and len(prefFrees) != 0:
                 if force_pref_free:
                     model.Add(sum(prefFrees) == len(prefFrees))
                 else:
-                    model.Maximize(sum(prefFrees))
-
+                    missedPrefFrees += [1 - i for i in prefFrees]
+    if missedPrefFrees:
+        terms['pref_free'] = sum(missedPrefFrees)
+
+    family('max_n_days_consec_shifts')
+    if max_n_days_consec_shifts:
+        for (n, collected_free_days) in collectedFreeDays.items():
+            # a day off after at most max_consec_shifts worked days
+            length = max_consec_shifts
+            if employees[n].max_consec_shifts is not None:
+                length = employees[n].max_consec_shifts + 1
+            addSlidingWindows(model, collected_free_days, length, atLeast=1,
+                              before=[0] * streaks.get(n, (0, 0))[0])
+
+    family('no_single_dayshift')
     if respect_no_single_dayshift:
-        for n in workerColumns['name']:
-            i = workerColumns['no_single_dayshift'][workerColumns['name'].index(n)]
-            if i == 'yes':
-                if doesShift(n, 'd'):
-                    for d in all_days:
+        for n in allEmployees:
+            if employees[n].no_single_dayshift:
+                if 'd' in employees[n].available:
+                    for d in cal.planned:
                         if (n,d,'d') in shifts:
                             if d > 1:
                                 if (n,d-1,'nhwk') in shifts:
@@ -360,161 +1110,46 @@ def main():
                             else:
                                 model.Add(shifts[(n,d,'d')] == 0)
 
+    family('last_month')
     #apply last month night shift constrains
-    if nightshift_last_month != "":
-        if (nightshift_last_month,1,'n') in shifts:
-            model.Add(shifts[(nightshift_last_month,1,'n')] == 0)
-        elif (nightshift_last_month,1,'wn') in shifts:
-            model.Add(shifts[(nightshift_last_month,1,'wn')] == 0)
-        elif (nightshift_last_month,1,'nhwk') in shifts:
-            model.Add(shifts[(nightshift_last_month,1,'nhwk')] == 0)
-
-#does48hours
-    for n in allEmployees:
-        does48_shift = does48hours(n)
-        double_shift = doesDoubleShift(n)
-        a = len(list(all_days))
-        for d in range(1,a):
-            availShifts = []
-            if (n,d,'nhwk') in shifts:
-                if (n,d+1,'n') in shifts:
-                    if (n,d+2,'n') in shifts:
-                        model.Add(sum([shifts[(n,d,'nhwk')], shifts[(n,d+1,'n')], shifts[(n,d+2,'n')]]) <= 2)
-            if (n,d,'n') in shifts:
-                if (n,d+1,'n') in shifts:
-                    if (n,d+2,'nhwk') in shifts:
-                        model.Add(sum([shifts[(n,d,'n')], shifts[(n,d+1,'n')], shifts[(n,d+2,'nhwk')]]) <= 2)
-            if (n,d,'n') in shifts:
-                if (n,d+1,'nhwk') in shifts:
-                    if (n,d+2,'nhwk') in shifts:
-                        model.Add(sum([shifts[(n,d,'n')], shifts[(n,d+1,'nhwk')], shifts[(n,d+2,'nhwk')]]) <= 2)
-            
-            if (n,d,'nhwk') in shifts:
-                if (n,d+1,'nhwk') in shifts:
-                    if (n,d+2,'wn') in shifts:
-                        model.Add(sum([shifts[(n,d,'nhwk')], shifts[(n,d+1,'nhwk')], shifts[(n,d+2,'wn')]]) <= 2)
-            if (n,d,'nhwk') in shifts:
-                if (n,d+1,'wn') in shifts:
-                    if (n,d+2,'wn') in shifts:
-                        model.Add(sum([shifts[(n,d,'nhwk')], shifts[(n,d+1,'wn')], shifts[(n,d+2,'wn')]]) <= 2)
-            if (n,d,'wn') in shifts:
-                if (n,d+1,'wn') in shifts:
-                    if (n,d+2,'nhwk') in shifts:
-                        model.Add(sum([shifts[(n,d,'wn')], shifts[(n,d+1,'wn')], shifts[(n,d+2,'nhwk')]]) <= 2)
-            if (n,d,'wn') in shifts:
-                if (n,d+1,'nhwk') in shifts:
-                    if (n,d+2,'n') in shifts:
-                        model.Add(sum([shifts[(n,d,'wn')], shifts[(n,d+1,'nhwk')], shifts[(n,d+2,'n')]]) <= 2)
-
-            if not does48_shift:
-                if (n,d,'n') in shifts:
-                   if (n,d+1,'n') in shifts:
-                        model.Add(sum([shifts[(n,d,'n')], shifts[(n,d+1,'n')]]) <= 1)
-
-                if (n,d,'n') in shifts:
-                   if (n,d+1,'nhwk') in shifts:
-                        model.Add(sum([shifts[(n,d,'n')], shifts[(n,d+1,'nhwk')]]) <= 1)
-                        
-                if (n,d,'n') in shifts:
-                    if (n,d+1,'wn') in shifts:
-                        model.Add(sum([shifts[(n,d,'n')], shifts[(n,d+1,'wn')]]) <= 1)
-                        
-                if (n,d,'wn') in shifts:
-                    if (n,d+1,'nhwk') in shifts:
-                        model.Add(sum([shifts[(n,d,'wn')], shifts[(n,d+1,'nhwk')]]) <= 1)
-
-                if (n,d,'wn') in shifts:
-                    if (n,d+1,'n') in shifts:
-                        model.Add(sum([shifts[(n,d,'wn')], shifts[(n,d+1,'n')]]) <= 1)
-                        
-                if (n,d,'wn') in shifts:
-                    if (n,d+1,'wn') in shifts:
-                        model.Add(sum([shifts[(n,d,'wn')], shifts[(n,d+1,'wn')]]) <= 1)
-
-                if (n,d,'nhwk') in shifts:
-                    if (n,d+1,'nhwk') in shifts:
-                        model.Add(sum([shifts[(n,d,'nhwk')], shifts[(n,d+1,'nhwk')]]) <= 1)
-
-                if (n,d,'nhwk') in shifts:
-                    if (n,d+1,'n') in shifts:
-                        model.Add(sum([shifts[(n,d,'nhwk')], shifts[(n,d+1,'n')]]) <= 1)
-                        
-                if (n,d,'nhwk') in shifts:
-                    if (n,d+1,'wn') in shifts:
-                        model.Add(sum([shifts[(n,d,'nhwk')], shifts[(n,d+1,'wn')]]) <= 1)
+    for e in employees:
+        if restsOnFirstNight(cal, e, lastNights) and (e.name,1,str(cal.night[1])) in shifts:
+            model.Add(shifts[(e.name,1,str(cal.night[1]))] == 0)
 
-            if not double_shift:
-                if (n,d,'n') in shifts:
-                    if (n,d+1,'d') in shifts:
-                        model.Add(sum([shifts[(n,d,'n')], shifts[(n,d+1,'d')]]) <= 1)
-                        
-                if (n,d,'wn') in shifts:
-                    if (n,d+1,'d') in shifts:
-                        model.Add(sum([shifts[(n,d,'wn')], shifts[(n,d+1,'d')]]) <= 1)
-
-                if (n,d,'nhwk') in shifts:
-                    if (n,d+1,'d') in shifts:
-                        model.Add(sum([shifts[(n,d,'nhwk')], shifts[(n,d+1,'d')]]) <= 1)
+    family('sequences')
+    #forbidden night sequences, does48hours and double shift
+    for e in employees:
+        addSequenceRules(model, shifts, e.name, cal.days, sequenceRules(e), sequence_encoding)
 
+    family('double_shift')
     #one free day between 36h shifts
-    for n in allEmployees:
-            double_shift = doesDoubleShift(n)
-            a = len(list(all_days))
-            for d in range(1,a):
-                cons = []
-                i = model.NewBoolVar('%s has doubleshift a starting at %s' % (n, d))
-                i1 = model.NewBoolVar('%s has doubleshift b starting at %s' % (n, d))
-                i2 = model.NewBoolVar('%s has doubleshift c starting at %s' % (n, d))
-                if (n,d,'n') in shifts and (n,d+1,'d') in shifts:
-                    cons.append(i)
-                    model.Add(sum([shifts[(n,d,'n')], shifts[(n,d+1,'d')]]) == 2).OnlyEnforceIf(i)
-                if (n,d,'wn') in shifts and (n,d+1,'d') in shifts:
-                    cons.append(i1)
-                    model.Add(sum([shifts[(n,d,'wn')], shifts[(n,d+1,'d')]]) == 2).OnlyEnforceIf(i1)
-                if (n,d,'nhwk') in shifts and (n,d+1,'d') in shifts:
-                    cons.append(i2)
-                    model.Add(sum([shifts[(n,d,'nhwk')], shifts[(n,d+1,'d')]]) == 2).OnlyEnforceIf(i2)
-
-                i3 = model.NewBoolVar('%s has doubleshift safe starting at %s' % (n, d))
-                model.Add(sum(cons) == 1).OnlyEnforceIf(i3)
-
-                if (n,d+2,'n') in shifts and (n,d+2,'d') in shifts:
-                    model.Add(sum([shifts[(n,d+2,'n')], shifts[(n,d+2,'d')]]) == 0).OnlyEnforceIf(i3)
-                if (n,d+2,'wn') in shifts and (n,d+2,'d') in shifts:
-                    model.Add(sum([shifts[(n,d+2,'wn')], shifts[(n,d+2,'d')]]) == 0).OnlyEnforceIf(i3)
-                if (n,d+2,'nhwk') in shifts and (n,d+2,'d') in shifts:
-                    model.Add(sum([shifts[(n,d+2,'nhwk')], shifts[(n,d+2,'d')]]) == 0).OnlyEnforceIf(i3)
-
-    # the max work which all employees can fulfill
-    max_work = 0
-
-    hours_per_week = workerColumns['hours_per_week']
-    overtime_per_employee = workerColumns['overtime']
+    for e in employees:
+        if e.double_shift:
+            addSequenceRules(model, shifts, e.name, cal.days, restAfterDoubleShift, sequence_encoding)
 
+    family('worktime')
     deviation = {}
     diff = {}
+    maxDevs = []
 
     if respect_worktime:
-        for n in workerColumns['name']:
+        for n in allEmployees:
 
             # calculate avg worktime per day
-            avg = int(int(hours_per_week[workerColumns['name'].index(n)]) / 5 * 60)
+            avg = int(employees[n].hours_per_week / 5 * 60)
 
             # add all vacations worktime
-            for e in list(all_days):
-                date = datetime.date(year, month, e)
-                weekday = date.weekday()
-                if onVacation(n,e) and weekday != 6 and weekday != 5:
+            for e in sorted(employees[n].vacation):
+                if e in cal.planned and not cal.weekend[e]:
                     worktimes_per_worker[n].append(avg)
 
             #apply last month
-            if n == nightshift_last_month:
-                if isLastMonthShiftN(n,1):
-                    worktimes_per_worker[n].append(555) #9,25 #TODO
-                elif isLastMonthShiftWN(n,1):
-                    worktimes_per_worker[n].append(315) #5,25 #TODO
-                elif isLastMonthShiftHWK(n,1):
-                    worktimes_per_worker[n].append(510) #8,5  #TODO
+            prev = cal.firstDay - 1
+            if prev == 0:
+                if lastMonthShift(lastNights, n, 1):
+                    worktimes_per_worker[n].append(lastMonthNightMinutes[lastMonthShift(lastNights, n, 1)])
+            elif (n, prev, str(cal.night[prev])) in shifts:
+                worktimes_per_worker[n].append(lastMonthNightMinutes[str(cal.night[prev])] * shifts[(n, prev, str(cal.night[prev]))])
 
             #apply last month
             #ab1 = model.NewIntVar(-1000, 1, "lastmonth%s%i" % (n,d))
@@ -532,200 +1167,55 @@ def main():
             #worktimes_per_worker[n].append(ab1)
 
             #apply team meetings
-            for d in all_days:
-                if not onVacation(n,d) and d in team_meetings:
+            for d in cal.planned:
+                if not d in employees[n].vacation and cal.team_meeting[d]:
                     ab = model.NewIntVar(0, team_meeting_time, "tm%s%i" % (n,d))
-                    if (n, d-1, 'n') in shifts:
-                        model.Add(ab == team_meeting_time).OnlyEnforceIf(shifts[(n, d-1, 'n')].Not())
-                    elif (n, d-1, 'wn') in shifts:
-                        model.Add(ab == team_meeting_time).OnlyEnforceIf(shifts[(n, d-1, 'wn')].Not())
-                    elif (n, d-1, 'nhwk') in shifts:
-                        model.Add(ab == team_meeting_time).OnlyEnforceIf(shifts[(n, d-1, 'nhwk')].Not())
-
-                    if (n, d-1, 'n') in shifts:
-                        model.Add(ab == team_meeting_time - 30).OnlyEnforceIf(shifts[(n, d-1, 'n')])
-                    elif (n, d-1, 'wn') in shifts:
-                        model.Add(ab == team_meeting_time - 30).OnlyEnforceIf(shifts[(n, d-1, 'wn')].Not())
-                    elif (n, d-1, 'nhwk') in shifts:
-                        model.Add(ab == team_meeting_time).OnlyEnforceIf(shifts[(n, d-1, 'nhwk')].Not())
-                    worktimes_per_worker[n].append(ab)
-
-
-            #set worktime constraints
-            #short night shift not weekend
-
-            #collect all day where a normal night shift is starting
-            tmpDays = [int]
-            for e in list(all_days):
-                date = datetime.date(year, month, e)
-                weekday = date.weekday()
-                if weekday == 6 or weekday == 2 or weekday == 3:
-                    tmpDays.append(e)
-            for d in tmpDays:
-
-                #if n is able to do nhwk shift
-                if (n, d, 'nhwk') in shifts:
-                    ab = model.NewIntVar(0, nightShiftHoursNPlusD, "int%s%inhwk" % (n,d))
-
-                    #if n can do day shift next day too
-                    if (n, d+1, 'd') in shifts:
-                        kn = model.NewBoolVar("boolfollowd%s%in" % (n,d))
-                        kn1 = model.NewBoolVar("boolnotfollowd%s%in" % (n,d))
-                        kn2 = model.NewBoolVar("boolnotsfollowd%s%in" % (n,d))
-                        kn3 = model.NewBoolVar("boolnotdsfollowd%s%in" % (n,d))
-
-                        model.AddBoolXOr([kn, kn1, kn2, kn3])
-
-                        #check all combinations off nhwk and day on d+1
-                        model.Add(sum([shifts[(n, d, 'nhwk')], shifts[(n, d+1, 'd')]]) == 2).OnlyEnforceIf(kn)
-                        model.Add(sum([shifts[(n, d, 'nhwk')], shifts[(n, d+1, 'd')].Not()]) == 2).OnlyEnforceIf(kn1)
-                        model.Add(sum([shifts[(n, d, 'nhwk')].Not(), shifts[(n, d+1, 'd')].Not()]) == 2).OnlyEnforceIf(kn2)
-                        model.Add(sum([shifts[(n, d, 'nhwk')].Not(), shifts[(n, d+1, 'd')]]) == 2).OnlyEnforceIf(kn3)
-
-                        #TODO: Hier werden keine folgenden Nachtschiechten betrachtet...
-
-                        #if only night
-                        model.Add(ab == nightShiftHoursHWK).OnlyEnforceIf(kn1)
-                        if d+1 in team_meetings:
-                            model.Add(ab == 60).OnlyEnforceIf(kn) #TODO
-                        else:
-                            model.Add(ab == nightShiftHoursNPlusD).OnlyEnforceIf(kn)
-                        
-                        #if n does nothing or only the next day, dont add time for this day
-                        model.Add(ab == 0).OnlyEnforceIf(kn2)
-                        model.Add(ab == 0).OnlyEnforceIf(kn3)
+                    # 'n' and 'wn' end at 13:30, within the meeting
+                    prev = (n, d-1, str(cal.night[d-1]))
+                    if prev in shifts and prev[2] != 'nhwk':
+                        model.Add(ab == team_meeting_time - 30).OnlyEnforceIf(shifts[prev])
+                        model.Add(ab == team_meeting_time).OnlyEnforceIf(shifts[prev].Not())
                     else:
-                        #n can do the shift nhwk, and not d on next day (if d on d+1 was never an option)
-                        model.Add(ab == nightShiftHoursHWK).OnlyEnforceIf(shifts[(n, d, 'nhwk')])
-
-                    model.Add(ab == 0).OnlyEnforceIf(shifts[(n, d, 'nhwk')].Not())
+                        model.Add(ab == team_meeting_time)
                     worktimes_per_worker[n].append(ab)
 
-            #long night shift not weekend
-            tmpDays = [int]
-            for e in list(all_days):
-                date = datetime.date(year, month, e)
-                weekday = date.weekday()
-                if weekday == 1 or weekday == 0:
-                    tmpDays.append(e)
-            for d in tmpDays:
-                if (n, d, 'n') in shifts:
-                    ab = model.NewIntVar(0, nightShiftHoursN, "int%s%ind" % (n,d))
-
-                    if (n, d+1, 'd') in shifts:
-                        kn = model.NewBoolVar("nboolfollowd%s%in" % (n,d))
-                        kn1 = model.NewBoolVar("nboolnotfollowd%s%in" % (n,d))
-                        kn2 = model.NewBoolVar("nboolnotsfollowd%s%in" % (n,d))
-                        kn3 = model.NewBoolVar("nboolnotdsfollowd%s%in" % (n,d))
-
-                        model.AddBoolXOr([kn, kn1, kn2, kn3])
-
-                        model.Add(sum([shifts[(n, d, 'n')], shifts[(n, d+1, 'd')]]) == 2).OnlyEnforceIf(kn)
-                        model.Add(sum([shifts[(n, d, 'n')], shifts[(n, d+1, 'd')].Not()]) == 2).OnlyEnforceIf(kn1)
-                        model.Add(sum([shifts[(n, d, 'n')].Not(), shifts[(n, d+1, 'd')].Not()]) == 2).OnlyEnforceIf(kn2)
-                        model.Add(sum([shifts[(n, d, 'n')].Not(), shifts[(n, d+1, 'd')]]) == 2).OnlyEnforceIf(kn3)
-
-                        model.Add(ab == nightShiftHoursN).OnlyEnforceIf(kn1)
-                        if d+1 in team_meetings:
-                            model.Add(ab == 60).OnlyEnforceIf(kn)
-                        else:
-                            model.Add(ab == nightShiftHoursNPlusD).OnlyEnforceIf(kn)
-                        
-                        model.Add(ab == 0).OnlyEnforceIf(kn2)
-                        model.Add(ab == 0).OnlyEnforceIf(kn3)
-                    else:
-                        model.Add(ab == nightShiftHoursN).OnlyEnforceIf(shifts[(n, d, 'n')])
 
-                    model.Add(ab == 0).OnlyEnforceIf(shifts[(n, d, 'n')].Not())
-                    worktimes_per_worker[n].append(ab)
-                
-            #day shift every day
-            for d in all_days:
-                if d == 0 and (n, d, 'd') in shifts:
-                    ab = model.NewIntVar(0, dayShiftHours, "int%s%id" % (n,d))
-                    model.Add(ab == dayShiftHours).OnlyEnforceIf(shifts[(n, d, 'd')])
-                    model.Add(ab == 0).OnlyEnforceIf(shifts[(n, d, 'd')].Not())
-                    worktimes_per_worker[n].append(ab)
-                else:
-                    if (n, d, 'd') in shifts and ((n, d-1, 'nhwk') in shifts or (n, d-1, 'n') in shifts or (n, d-1, 'wn') in shifts):
-                        if (n, d-1, 'nhwk') in shifts:
-                            ab = model.NewIntVar(0, dayShiftHours, "int%s%id" % (n,d))
-                            model.Add(ab == dayShiftHours).OnlyEnforceIf(shifts[(n, d-1, 'nhwk')].Not())
-                            model.Add(ab == dayShiftHours).OnlyEnforceIf(shifts[(n, d, 'd')])
-                            model.Add(ab == 0).OnlyEnforceIf(shifts[(n, d-1, 'nhwk')])
-                        elif (n, d-1, 'n') in shifts:
-                            ab = model.NewIntVar(0, dayShiftHours, "int%s%id" % (n,d))
-                            model.Add(ab == dayShiftHours).OnlyEnforceIf(shifts[(n, d-1, 'n')].Not())
-                            model.Add(ab == dayShiftHours).OnlyEnforceIf(shifts[(n, d, 'd')])
-                            model.Add(ab == 0).OnlyEnforceIf(shifts[(n, d-1, 'n')])
-                        elif (n, d-1, 'wn') in shifts:
-                            ab = model.NewIntVar(0, dayShiftHours, "int%s%id" % (n,d))
-                            model.Add(ab == dayShiftHours).OnlyEnforceIf(shifts[(n, d-1, 'wn')].Not())
-                            model.Add(ab == dayShiftHours).OnlyEnforceIf(shifts[(n, d, 'd')])
-                            model.Add(ab == 0).OnlyEnforceIf(shifts[(n, d-1, 'wn')])
-
-                        worktimes_per_worker[n].append(ab)
-                    else:
-                        if (n, d, 'd') in shifts:
-                            ab = model.NewIntVar(0, dayShiftHours, "int%s%id" % (n,d))
-                            model.Add(ab == dayShiftHours).OnlyEnforceIf(shifts[(n, d, 'd')])
-                            model.Add(ab == 0).OnlyEnforceIf(shifts[(n, d, 'd')].Not())
-                            worktimes_per_worker[n].append(ab)
-
-
-            tmpDays = [int]
-            for e in list(all_days):
-                date = datetime.date(year, month, e)
-                weekday = date.weekday()
-                if weekday == 4 or weekday == 5:
-                    tmpDays.append(e)
-            for d in tmpDays:
-                if (n, d, 'wn') in shifts:
-                    ab = model.NewIntVar(0, nightShiftHoursWeekend, "int%s%iwn" % (n,d))
-
-                    if (n, d+1, 'd') in shifts:
-                        kn = model.NewBoolVar("wnboolfollowd%s%in" % (n,d))
-                        kn1 = model.NewBoolVar("wnboolnotfollowd%s%in" % (n,d))
-                        kn2 = model.NewBoolVar("wnboolnotsfollowd%s%in" % (n,d))
-                        kn3 = model.NewBoolVar("wnboolnotdsfollowd%s%in" % (n,d))
-
-                        model.AddBoolXOr([kn, kn1, kn2, kn3])
-
-                        model.Add(sum([shifts[(n, d, 'wn')], shifts[(n, d+1, 'd')]]) == 2).OnlyEnforceIf(kn)
-                        model.Add(sum([shifts[(n, d, 'wn')], shifts[(n, d+1, 'd')].Not()]) == 2).OnlyEnforceIf(kn1)
-                        model.Add(sum([shifts[(n, d, 'wn')].Not(), shifts[(n, d+1, 'd')].Not()]) == 2).OnlyEnforceIf(kn2)
-                        model.Add(sum([shifts[(n, d, 'wn')].Not(), shifts[(n, d+1, 'd')]]) == 2).OnlyEnforceIf(kn3)
-
-                        model.Add(ab == nightShiftHoursWeekend).OnlyEnforceIf(kn1)
-                        if d+1 in team_meetings:
-                            model.Add(ab == 60).OnlyEnforceIf(kn)
-                        else:
-                            model.Add(ab == nightShiftHoursWNPlusD).OnlyEnforceIf(kn)
-                        
-                        model.Add(ab == 0).OnlyEnforceIf(kn2)
-                        model.Add(ab == 0).OnlyEnforceIf(kn3)
+            #worked minutes of the shifts, a night followed by a day shift of the
+            #same employee counts as one double shift
+            for d in cal.planned:
+                night = (n, d, str(cal.night[d]))
+                if night in shifts:
+                    worktimes_per_worker[n].append(nightShiftMinutes[night[2]] * shifts[night])
+                if (n, d, 'd') in shifts:
+                    worktimes_per_worker[n].append(dayShiftHours * shifts[(n, d, 'd')])
+                if night in shifts and (n, d+1, 'd') in shifts:
+                    double = model.NewBoolVar("double%s%i" % (n, d))
+                    model.AddImplication(double, shifts[night])
+                    model.AddImplication(double, shifts[(n, d+1, 'd')])
+                    model.AddBoolOr([shifts[night].Not(), shifts[(n, d+1, 'd')].Not(), double])
+                    if cal.team_meeting[d+1] and doubleShiftTeamMeetingMinutes is not None:
+                        doubleMinutes = doubleShiftTeamMeetingMinutes
                     else:
-                        model.Add(ab == nightShiftHoursWeekend).OnlyEnforceIf(shifts[(n, d, 'wn')])
-
-                    model.Add(ab == 0).OnlyEnforceIf(shifts[(n, d, 'wn')].Not())
-                    worktimes_per_worker[n].append(ab)
-                    
+                        doubleMinutes = doubleShiftMinutes[night[2]]
+                    worktimes_per_worker[n].append((doubleMinutes - nightShiftMinutes[night[2]] - dayShiftHours) * double)
 
             #max worktime
-            maxworktime = int((int(hours_per_week[workerColumns['name'].index(n)]) / 5) * (len(all_days) - free_days_count) * 60)
+            maxworktime = int((employees[n].hours_per_week / 5) * (len(cal.planned) - free_days_count) * 60)
 
-            print("%s should work %i minutes per month" % (n, maxworktime))
+            print("%s should work %i minutes in %i days" % (n, maxworktime, len(cal.planned)))
 
             #add overtime
-            ot = int(overtime_per_employee[workerColumns['name'].index(n)]) * 60
+            ot = employees[n].overtime * 60
             
             # work with deviation
             # https://stackoverflow.com/questions/69498730/google-or-tools-employee-scheduling-minimze-the-deviation-between-how-many-ho
-            maxDev = (maxworktime) * (maxworktime)
+            ot = int(ot * overtime_modifier)
+            # carried over overtime of a rolling horizon can exceed the worktime itself
+            maxDev = (maxworktime) * (maxworktime) + abs(ot)
+            maxDevs.append(maxDev)
             deviation[n] = model.NewIntVar(-1000000, maxDev, "Deviation_for_employee_%s" % (n))
             diff[n] = model.NewIntVar(-maxDev, maxDev,"Diff_for_employee_%s" % (n))
 
-            ot = int(ot * overtime_modifier)
             model.Add(diff[n] == sum(worktimes_per_worker[n]) - maxworktime + ot)
             
             minusDiff = model.NewIntVar(-maxDev, maxDev,"minusDiff_for_employee_%s" % (n))
@@ -733,281 +1223,690 @@ def main():
             operands = [diff[n], minusDiff]
             model.AddMaxEquality(deviation[n], operands)
 
-            max_work += maxworktime
-
-        objective = model.NewIntVar(0, len(allEmployees) * hardCap, "Objective")
+        objective = model.NewIntVar(0, max([len(allEmployees) * hardCap * len(cal.periods())] + maxDevs), "Objective")
         model.AddMaxEquality(objective, deviation.values())
+        terms['overtime'] = objective
+
+    family('previous_schedule')
+    if previous:
+        # warm start from the previous schedule of the days it covers
+        previousDates = {date for (n, date, s) in previous}
+        changes = []
+        for ((n, d, s), var) in shifts.items():
+            if d in cal.planned and cal.dates[d] in previousDates:
+                if (n, cal.dates[d], s) in previous:
+                    model.AddHint(var, 1)
+                    changes.append(1 - var)
+                else:
+                    model.AddHint(var, 0)
+                    changes.append(var)
+        if changes:
+            terms['minimal_change'] = sum(changes)
 
-        model.Minimize(objective)
-
+    family('max_two_consec_dayshifts')
     if max_two_consec_dayshifts:
         for n in allEmployees:
-            a = len(list(all_days))
-            for d in range(1,a,2):
-                if (n,d,'d') in shifts:
-                    if (n,d+1,'d') in shifts:
-                        model.Add(sum([shifts[(n,d,'d')], shifts[(n,d+1,'d')]]) <= 1)
-
-    # some checks that should avoid wrong calculation
-    if max_work < reqMinutes:
-        print('Warning: The current employee setup cannot fulfill the worktime requirements. They will work overtime.')
-
-    # Creates the solver and solve.
-    solver = cp_model.CpSolver()
+            addSlidingWindows(model, [shifts.get((n, d, 'd'), 0) for d in all_days], 3, atMost=2,
+                              before=[1] * streaks.get(n, (0, 0))[1])
+
+    family('symmetry')
+    if symmetry_breaking:
+        # hints, fixed days, taken over nights and carried streaks refer to single employees
+        excluded = set(lastNights) | {n for (n, date, s) in fixed} | {n for (n, date, s) in previous or ()}
+        excluded |= {n for (n, streak) in streaks.items() if any(streak)}
+        groups = [[n for n in group if n not in excluded] for group in employees.interchangeable()]
+        groups = [group for group in groups if len(group) > 1]
+        for group in groups:
+            for (a, b) in zip(group, group[1:]):
+                keys = sorted((d, s) for (m, d, s) in shifts if m == a)
+                addLexGreaterEqual(model, [shifts[(a, d, s)] for (d, s) in keys], [shifts[(b, d, s)] for (d, s) in keys])
+        metrics.info['interchangeable_groups'] = [len(group) for group in groups]
+        print('%i groups of interchangeable employees' % len(groups))
+
+    family('objective')
+    weights = objectiveWeights(config, changeWeight)
+    if weights['weekend_fairness']:
+        fairness = addWeekendFairness(model, shifts, cal)
+        if fairness is not None:
+            terms['weekend_fairness'] = fairness
+    objectives = objectiveStages(config, terms, weights)
+    if objectives:
+        model.Minimize(objectives[0][1])
+    metrics.info['objectives'] = [name for (name, expr) in objectives]
+
+    metrics.stop()
+    names = list(families)
+    ends = [families[name] for name in names[1:]] + [len(model.Proto().constraints)]
+    families = {name: range(families[name], end) for (name, end) in zip(names, ends)}
+    gates = {}
+    if gated:
+        literals = gateFamilies(model, families, toggleFlags.values())
+        gates = {f: literals[name] for (f, name) in toggleFlags.items()}
+        model.AddAssumptions(flagAssumptions(gates, flags))
+    schedule = Schedule(model, cal, employees, lastNights, shifts, worktimes_per_worker, all_weekends, all_emp_free_days, free_days_count, metrics, objectives, families, freeDays)
+    schedule.gates = gates
+    schedule.flags = flags
+    return schedule
+
+def flagAssumptions(gates, flags):
+    """Assumptions switching the families of the gate literals on or off as in flags."""
+    return [lit if flags[f] else lit.Not() for (f, lit) in gates.items()]
+
+def objectiveWeights(config, changeWeight=0):
+    """Weight of each objective term, from the optional [Objective] section.
+
+    The minimal_change weight is changeWeight (minimal_change_weight or
+    --min-change).
+    """
+    section = config['Objective'] if config.has_section('Objective') else {}
+    weights = {t: int(section.get(t, w)) for (t, w) in defaultObjectiveWeights.items()}
+    weights['minimal_change'] = changeWeight
+    return weights
+
+def objectiveStages(config, terms, weights):
+    """The objectives to minimize one after another, as (name, expr) stages.
+
+    'weighted' mode has a single stage with the weighted sum of the terms,
+    'lexicographic' one stage per term, in the order of priority. Terms with
+    weight 0 or without variables in the model are left out.
+    """
+    section = config['Objective'] if config.has_section('Objective') else {}
+    mode = section.get('mode', 'weighted')
+    priority = [t.strip() for t in section.get('priority', ','.join(objectiveTerms)).split(',') if t.strip()]
+    for t in priority:
+        if t not in objectiveTerms:
+            print('Warning: unknown objective term %s' % t)
+    # terms missing in priority come last
+    order = [t for t in priority if t in objectiveTerms] + [t for t in objectiveTerms if t not in priority]
+    used = [t for t in order if weights[t] and t in terms]
+    if not used:
+        return []
+    if mode == 'lexicographic':
+        return [(t, terms[t]) for t in used]
+    if mode != 'weighted':
+        raise ValueError('unknown objective mode %s' % mode)
+    return [('weighted', sum(weights[t] * terms[t] for t in used))]
+
+def addWeekendFairness(model, shifts, cal):
+    """Difference between the most and the fewest shifts starting on a
+    Saturday or Sunday of the planned days, over all employees which can
+    work one. None without any weekend shift."""
+    counts = {}
+    for ((n, d, s), var) in shifts.items():
+        if d in cal.planned and cal.weekend[d]:
+            counts.setdefault(n, []).append(var)
+    if not counts:
+        return None
+    most = model.NewIntVar(0, 2 * len(cal.planned), 'most weekend shifts')
+    fewest = model.NewIntVar(0, 2 * len(cal.planned), 'fewest weekend shifts')
+    model.AddMaxEquality(most, [sum(v) for v in counts.values()])
+    model.AddMinEquality(fewest, [sum(v) for v in counts.values()])
+    return most - fewest
+
+def sequenceRules(employee):
+    """Shift sequences the employee may not work on consecutive days."""
+    rules = list(forbiddenSequences)
+    if not employee.does48hours:
+        rules += forbiddenWithout48Hours
+    if not employee.double_shift:
+        rules += forbiddenWithoutDoubleShift
+    return rules
+
+def addSequenceRules(model, shifts, n, days, rules, encoding='table'):
+    """Forbids every rule (shift on day d, shift on d+1, ...) starting on one of days.
+
+    'table' adds one AddForbiddenAssignments per day over the shifts all
+    rules starting that day refer to, 'linear' one sum(...) <= len(rule)-1
+    per rule and day.
+    """
+    for d in days:
+        sequences = []
+        for rule in rules:
+            keys = [(n, d + i, s) for (i, s) in enumerate(rule)]
+            if all(k in shifts for k in keys):
+                sequences.append(keys)
+        if not sequences:
+            continue
+        if encoding == 'linear':
+            for keys in sequences:
+                model.Add(sum(shifts[k] for k in keys) <= len(keys) - 1)
+            continue
+        scope = sorted({k for keys in sequences for k in keys}, key=lambda k: (k[1], k[2]))
+        forbidden = [values for values in itertools.product((0, 1), repeat=len(scope))
+                     if any(all(values[scope.index(k)] for k in keys) for keys in sequences)]
+        model.AddForbiddenAssignments([shifts[k] for k in scope], forbidden)
+
+def addSlidingWindows(model, literals, length, atLeast=None, atMost=None, before=()):
+    """Bounds the sum of every length consecutive entries of literals.
+
+    literals holds one BoolVar or 0/1 constant per day. before are the known
+    values of the days right before them, e.g. carried over from the
+    previous period, so that the first windows cross the period boundary.
+    Windows of constants only are skipped.
+    """
+    values = list(before)[len(before) - length + 1:] if length > 1 else []
+    offset = len(values)
+    values += literals
+    for start in range(max(0, offset - length + 1), len(values) - length + 1):
+        window = values[start:start + length]
+        if all(isinstance(v, int) for v in window):
+            continue
+        if atLeast is not None:
+            model.Add(sum(window) >= atLeast)
+        if atMost is not None:
+            model.Add(sum(window) <= atMost)
+
+def addLexGreaterEqual(model, x, y):
+    """x >= y lexicographically, for two equally long lists of BoolVars."""
+    prefixEqual = model.NewConstant(1)
+    for (a, b) in zip(x, y):
+        model.Add(a >= b).OnlyEnforceIf(prefixEqual)
+        # equal is true exactly if x and y are equal up to here
+        equal = model.NewBoolVar('')
+        model.AddImplication(equal, prefixEqual)
+        model.Add(a == b).OnlyEnforceIf(equal)
+        model.AddBoolOr([prefixEqual.Not(), a, b, equal])
+        model.AddBoolOr([prefixEqual.Not(), a.Not(), b.Not(), equal])
+        prefixEqual = equal
+
+def solved(status):
+    return status == cp_model.OPTIMAL or status == cp_model.FEASIBLE
+
+def solveAndRender(schedule, config, args, nights=None):
+    """Solves, prints and renders schedule (decomposed with the nights only
+    schedule nights). Returns the Solution."""
+    solution = solveSchedule(schedule, config, args, nights)
+    if solution.feasible:
+        printStatistics(solution.solver)
+        printSolution(schedule, solution.solver)
+        for format in outputFormats(config, args):
+            try:
+                render(solution, format, openFile=not args.headless)
+            except ImportError as e:
+                print('Could not write the %s output: %s' % (format, e))
+    else:
+        print('No solution found ! (%s)' % solution.statusName)
+        if solution.status == cp_model.INFEASIBLE:
+            printConflicts(explain(schedule, readSolverParameters(config, args))[1])
+    if args.metrics:
+        first = schedule.cal.dates[schedule.cal.firstDay]
+        schedule.metrics.write(args.metrics, period='%i-%i' % (first.month, first.year))
+    return solution
+
+def solvePoolAndRender(schedule, config, args, size):
+    """Solves a pool of alternative schedules and renders them side by side."""
+    params = readSolverParameters(config, args)
+    tolerance = args.pool_tolerance
+    if tolerance is None:
+        tolerance = float(config["General"].get("pool_tolerance", "0.0"))
+    minDistance = args.pool_distance or int(config["General"].get("pool_min_distance", "2"))
+    print('Solve a pool of %i schedules, objective tolerance %s, min distance %i...' % (size, tolerance, minDistance))
+
+    pool = solvePool(schedule, size, params, tolerance, minDistance)
+    for (i, solution) in enumerate(pool):
+        if solution.feasible:
+            print('  schedule %i: objective %i (%s, %.2f s)' % (i + 1, solution.objective, solution.statusName, solution.wallTime))
+    if not pool[0].feasible:
+        print('No solution found ! (%s)' % pool[0].statusName)
+    else:
+        printStatistics(pool[0].solver)
+        writePool(schedule, pool, openFile=not args.headless)
+    if args.metrics:
+        first = schedule.cal.dates[schedule.cal.firstDay]
+        schedule.metrics.write(args.metrics, period='%i-%i' % (first.month, first.year))
+    return [solveResult(solution) for solution in pool]
+
+def solveWhatIf(schedule, config, args, names):
+    """Solves every on/off combination of the toggleFlags names (--what-if)
+    on the gated schedule and writes the results to whatif-month-year.csv."""
+    for name in names:
+        if name not in toggleFlags:
+            print('Error: %s can not be switched, choose from %s' % (name, ', '.join(toggleFlags)))
+            return []
+    flagSets = [dict(zip(names, values)) for values in itertools.product((True, False), repeat=len(names))]
+    params = readSolverParameters(config, args)
+    jobs = min(args.jobs or os.cpu_count(), len(flagSets))
+    if args.num_workers is None:
+        # share the cores between the variants
+        params['num_workers'] = max(1, os.cpu_count() // jobs)
+    print('Solve %i variants, %i at once with %i solver workers each...' % (len(flagSets), jobs, params['num_workers']))
+
+    solutions = solveMatrix(schedule, flagSets, params, jobs)
+    first = schedule.cal.dates[schedule.cal.firstDay]
+    period = '%i-%i' % (first.month, first.year)
+    results = []
+    for (i, name) in enumerate(names):
+        print('  v%i = %s' % (i + 1, name))
+    print(' '.join('%-5s' % ('v%i' % (i + 1)) for i in range(len(names))) + ' %-10s %9s %9s %8s' % ('status', 'objective', 'bound', 'time'))
+    for (flags, solution) in zip(flagSets, solutions):
+        result = solveResult(solution)
+        print(' '.join('%-5s' % ('on' if flags[name] else 'off') for name in names) + ' %-10s %9s %9s %8.2f' % (
+            result['status'], result['objective'], result['best_bound'], result['wall_time']))
+        result['period'] = '%s %s' % (period, ' '.join('%s=%s' % (name, flags[name]) for name in names))
+        results.append(dict(result, **flags))
+
+    fileName = 'whatif-%s.csv' % period
+    with open(fileName, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=names + ['status', 'objective', 'best_bound', 'wall_time'], extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+    print('Variants written to %s' % fileName)
+    return [{k: r[k] for k in ('period', 'status', 'objective', 'best_bound', 'wall_time')} for r in results]
+
+def checkSchedule(schedule, config, args):
+    """Only checks whether schedule is feasible (--check). Returns the batch index result."""
+    print('Check feasibility...')
+    status, conflicts = explain(schedule, readSolverParameters(config, args))
+    if status == 'INFEASIBLE':
+        printConflicts(conflicts)
+    elif status == 'UNKNOWN':
+        print('The check did not finish in time, raise --time-limit.')
+    else:
+        print('No conflict found.')
+    first = schedule.cal.dates[schedule.cal.firstDay]
+    return {'period': '%i-%i' % (first.month, first.year),
+            'status': {'INFEASIBLE': 'INFEASIBLE', 'UNKNOWN': 'UNDECIDED'}.get(status, 'CHECKED'),
+            'objective': '', 'best_bound': '', 'wall_time': ''}
+
+def printConflicts(conflicts):
+    if conflicts is None:
+        print('The conflicting constraints could not be found in time.')
+        return
+    if not conflicts:
+        print('The days carried over or the worktime bounds have no schedule.')
+        return
+    print('Conflicting constraint families:')
+    for (name, names, dates) in conflicts:
+        print('  %s: %s; %s' % (name, ', '.join(names) or 'all employees',
+                                ', '.join(date.isoformat() for date in dates) or 'all days'))
+
+def infeasibleInputResult(start, e):
+    """Batch index result of an input precheck() rejected."""
+    print('The input has no schedule:')
+    for problem in e.problems:
+        print('  %s' % problem)
+    return {'period': '%i-%i' % (start.month, start.year), 'status': 'INFEASIBLE_INPUT',
+            'objective': '', 'best_bound': '', 'wall_time': 0}
+
+def solveResult(solution):
+    """Summary of one solve for the batch index."""
+    cal = solution.schedule.cal
+    first = cal.dates[cal.firstDay]
+    result = {'period': '%i-%i' % (first.month, first.year),
+              'status': solution.statusName,
+              'objective': solution.objective if solution.feasible else '',
+              'best_bound': solution.bound if solution.bound is not None else '',
+              'wall_time': round(solution.wallTime, 3)}
+    if solution.stages:
+        # lexicographic: the value of every stage, the bound of the stage solved last
+        result['objective'] = ' '.join('%s=%i' % stage for stage in solution.stages)
+        result['best_bound'] = '%s=%i' % (solution.objectiveName, solution.bound)
+    return result
+
+def solveSchedule(schedule, config, args, nights=None):
+    params = readSolverParameters(config, args)
+    for (k, v) in params.items():
+        print('  %s = %s' % (k, v))
     print('Start solving...')
-    status = solver.Solve(model)
+    moves = args.moves if args.moves is not None else int(config["General"].get("lns_moves", "20"))
+    neighbourhoods = [n.strip() for n in config["General"].get("lns_neighbourhoods", "").split(',') if n.strip()] or None
+    if nights is not None:
+        solution = solveDecomposed(schedule, nights, params, moves, neighbourhoods)
+    elif args.lns or config["General"].get("lns", "False") == 'True':
+        solution = solveLns(schedule, params, moves, neighbourhoods)
+    elif args.stream or config["General"].get("stream_solutions", "False") == 'True':
+        first = schedule.cal.dates[schedule.cal.firstDay]
+        writer = SolutionWriter(schedule.shifts, schedule.cal.dates, "shifts-%i-%i" % (first.month, first.year))
+        solution = solve(schedule, params, writer)
+        writer.close()
+        print('%i improving solutions written to %s' % (writer.count, writer.jsonFile))
+    else:
+        solution = solve(schedule, params)
 
-    if status == cp_model.FEASIBLE:
+    if solution.status == cp_model.FEASIBLE:
         print("A solution was found, but we don't know if it's optimal...")
 
-    if status == cp_model.OPTIMAL:
-
-        # create panda dataframe
-        d = pd.to_datetime(f'{calendar.month_name[month]} {year}', format='%B %Y')
-        dates = pd.date_range(start = d, periods = d.daysinmonth)
-        df = pd.DataFrame(index=dates, columns=allEmployees)
-
-        ind = ["overtime", "actual worktime", "target worktime"]
-        odf = pd.DataFrame(index=ind, columns=allEmployees)
-
-
-        print('Solution:')
-        
-        for d in all_days:
-            date = datetime.date(year, month, d)
-            print('Day %i %s' % (d, calendar.day_name[date.weekday()]))
-
-            pre_day = False
-            if d-1 > 1:
-                pre_day = True
-
-            is_tm = False
-            if str(d) in team_meetings:
-                is_tm = True
-            for n in allEmployees:
-                date = datetime.date(year, month, d)
-                currentDay = date.strftime("%Y-%m-%d")
-
-                end = ""
-                if is_tm == True and not onVacation(n,d):
-                    end += "TM "
-            
-                for s in allShifts:
-
-                    if (n, d, s) in shifts:
-                        if solver.Value(shifts[(n, d, s)]) == 1:
-                            print('  Employee %s works shift %s' % (n, s))
-                            
-                            if d+1 < len(list(all_days)):
-                                date = datetime.date(year, month, d+1)
-
-                            if s == "d":
-                                if pre_day or isLastMonthShiftN(n,d) or isLastMonthShiftWN(n,d) or isLastMonthShiftHWK(n,d):
-                                    if ((n, d-1, "n") in shifts and solver.Value(shifts[(n, d-1, "n")])) == 1 or isLastMonthShiftN(n,d):
-                                        end += "05:00-20:00"
-                                    elif ((n, d-1, "nhwk") in shifts and solver.Value(shifts[(n, d-1, "nhwk")]) == 1) or isLastMonthShiftHWK(n,d):
-                                        end += "05:00-20:00"
-                                    elif ((n, d-1, "wn") in shifts and solver.Value(shifts[(n, d-1, "wn")]) == 1) or isLastMonthShiftWN(n,d):
-                                        end += "06:00-20:00"
-                                    else:
-                                        end += "14:00-20:00"
-                                else:
-                                    end += "14:00-20:00"
-                            elif s == "n":
-                                end += "13:00-22:00"
-                            elif s == "wn":
-                                end += "13:00-22:00"
-                            elif s == "nhwk":
-                                end += "13:00-22:00"
-
-                if (n, d-1, "n") in shifts and ((n, d, "d") in shifts or str(d) in no_dayshift or not doesShift(n, "d")):
-                    if solver.Value(shifts[(n, d-1, "n")]) == 1 and (str(d) in no_dayshift or not doesShift(n, "d") or solver.Value(shifts[(n, d, "d")]) == 0):
-                        dt = datetime.date(year, month, d)
-                        if dt.weekday() == (1 or 2):
-                            end = end + "05:00-13:30"
-
-
-                elif (n, d-1, "nhwk") in shifts and ((n, d, "d") in shifts or str(d) in no_dayshift or not doesShift(n, "d")):
-                    if solver.Value(shifts[(n, d-1, "nhwk")]) == 1 and (str(d) in no_dayshift or not doesShift(n, "d") or solver.Value(shifts[(n, d, "d")]) == 0):
-                        end = end + "05:00-09:00"
-
-                elif (n, d-1, "wn") in shifts and ((n, d, "d") in shifts or str(d) in no_dayshift or not doesShift(n, "d")):
-                    if solver.Value(shifts[(n, d-1, "wn")]) == 1 and (str(d) in no_dayshift or not doesShift(n, "d") or solver.Value(shifts[(n, d, "d")]) == 0):
-                        end = end + "06:00-13:30"
-
-                if (n, d-1, "wn") in shifts and ((n, d, "n") in shifts):
-                    if solver.Value(shifts[(n, d-1, "wn")]) == 1 and solver.Value(shifts[(n, d, "n")]) == 1:
-                        end = "06:00-22:00"
-
-                elif (n, d-1, "wn") in shifts and ((n, d, "wn") in shifts):
-                    if solver.Value(shifts[(n, d-1, "wn")]) == 1 and solver.Value(shifts[(n, d, "wn")]) == 1:
-                        end = "06:00-22:00"
-
-                elif (n, d-1, "wn") in shifts and ((n, d, "nhwk") in shifts):
-                    if solver.Value(shifts[(n, d-1, "wn")]) == 1 and solver.Value(shifts[(n, d, "nhwk")]) == 1:
-                        end = "06:00-22:00"
-
-                elif (n, d-1, "n") in shifts and ((n, d, "nhwk") in shifts):
-                    if solver.Value(shifts[(n, d-1, "n")]) == 1 and solver.Value(shifts[(n, d, "nhwk")]) == 1:
-                        end = "05:00-22:00"
-
-                elif (n, d-1, "n") in shifts and ((n, d, "wn") in shifts):
-                    if solver.Value(shifts[(n, d-1, "n")]) == 1 and solver.Value(shifts[(n, d, "wn")]) == 1:
-                        end = "05:00-22:00"
-                elif (n, d-1, "n") in shifts and ((n, d, "n") in shifts):
-                        if solver.Value(shifts[(n, d-1, "n")]) == 1 and solver.Value(shifts[(n, d, "n")]) == 1:
-                            end = "05:00-22:00"
-
-                elif (n, d-1, "nhwk") in shifts and ((n, d, "nhwk") in shifts):
-                    if solver.Value(shifts[(n, d-1, "nhwk")]) == 1 and solver.Value(shifts[(n, d, "nhwk")]) == 1:
-                        end = "05:00-22:00"
-
-                elif (n, d-1, "nhwk") in shifts and ((n, d, "wn") in shifts):
-                    if solver.Value(shifts[(n, d-1, "nhwk")]) == 1 and solver.Value(shifts[(n, d, "wn")]) == 1:
-                        end = "05:00-22:00"
-                elif (n, d-1, "nhwk") in shifts and ((n, d, "n") in shifts):
-                        if solver.Value(shifts[(n, d-1, "nhwk")]) == 1 and solver.Value(shifts[(n, d, "n")]) == 1:
-                            end = "05:00-22:00"
-
-                elif (end == "" or end == "TM ") and ((isLastMonthShiftN(n,1) or isLastMonthShiftHWK(n,1) or isLastMonthShiftWN(n,1))) and d == 1:
-                    if isLastMonthShiftN(n,1):
-                        end += "05:00-13:30"
-                    elif isLastMonthShiftHWK(n,1):
-                        end += "05:00-09:00"
-                    elif isLastMonthShiftWN(n,1):
-                        end += "06:00-13:30"
-                df.xs(currentDay)[n] = end
-        print('')
-        print('Worktime:')
-        all_worktime = 0
-        for n in allEmployees:
-            minutes = solver.Value(sum(worktimes_per_worker[n]))
-            for aaaa in worktimes_per_worker[n]:
-                if solver.Value(aaaa) != 0:
-                    print(aaaa)
-                    print(solver.Value(aaaa))
-            all_worktime += minutes
-            odf.xs("actual worktime")[n] = "%i hours" % (minutes // 60)
-            print('  Employee %s works %i from minutes' % (n, minutes))
-
-        print((len(all_days) - free_days_count))
-        for n in allEmployees:
-            print(n)
-            print((int(hours_per_week[workerColumns['name'].index(n)]) / 5) * (len(all_days) - free_days_count))
-            print()
-            odf.xs("target worktime")[n] = "%i hours" % (round((int(hours_per_week[workerColumns['name'].index(n)]) / 5) * (len(all_days) - free_days_count)))
-
-        print('')
-        print('New Overtime:')
-        for n in allEmployees:
-            ot = int(overtime_per_employee[workerColumns['name'].index(n)])
-            minutes = solver.Value(sum(worktimes_per_worker[n]))
-            #newOvertime = ((minutes - int((int(hours_per_week[workerColumns['name'].index(n)]) / 5) * (len(all_days) - free_days_count) * 60)) / 60) + ot
-            newOvertime = ((minutes - round((int(hours_per_week[workerColumns['name'].index(n)]) / 5) * (len(all_days) - free_days_count) * 60)) / 60)
-            odf.xs("overtime")[n] = newOvertime
-            print('  Employee %s has now a overtime of %d hours' % (n, newOvertime))
-
-        print('')
-        print('free weekends:')
-        for n in all_weekends:
-            val = solver.Value(n)
-            if val == 1:
-                print('  weekend free %s' % (n))
-        print('')
-        print('free days:')
-        i = 0
-        for n in range(len(all_emp_free_days)):
-            a = solver.Value(all_emp_free_days[n])
-            if a == True:
-                
-                i += 1
-                print("  %s" % all_emp_free_days[n])
-    else:
-        print('No optimal solution found !')
-        return
-
-    df = df.fillna('')
+    for (name, value) in solution.stages:
+        print('Objective %s: %i' % (name, value))
+    label = ' (stage %s)' % solution.objectiveName if solution.stages else ''
+    if solution.feasible and solution.bound is not None:
+        print('Objective%s: %i (best bound %i)' % (label, solution.objective, solution.bound))
+    elif solution.feasible:
+        print('Objective%s: %i' % (label, solution.objective))
+    return solution
+
+def worktimeResults(schedule, solver):
+    """Worked and target minutes of each employee in the planned days."""
+    results = {}
+    workdays = len(schedule.cal.planned) - schedule.free_days_count
+    for e in schedule.employees:
+        minutes = solver.Value(sum(schedule.worktimes_per_worker[e.name]))
+        results[e.name] = (minutes, round((e.hours_per_week / 5) * workdays * 60))
+    return results
+
+def solutionValues(solver, variables):
+    """Values of the variables of the solved model as one array, read from
+    the solver response at once instead of one solver.Value() each."""
+    solution = np.asarray(solver.ResponseProto().solution)
+    return solution[[v.Index() for v in variables]]
+
+def assignmentArray(schedule, solver):
+    """The solution as boolean array of shape (employees, days, shifts).
+
+    Employees are in file order, days run from 0 (the day before the
+    horizon, with the night shifts of lastNights) to numDays+1 and the
+    shifts are those of arrayShifts.
+    """
+    names = schedule.employees.names
+    row = {n: i for (i, n) in enumerate(names)}
+    column = {s: i for (i, s) in enumerate(arrayShifts)}
+    keys = list(schedule.shifts)
+    assigned = np.zeros((len(names), schedule.cal.numDays + 2, len(arrayShifts)), dtype=bool)
+    if keys:
+        assigned[[row[n] for (n, d, s) in keys], [d for (n, d, s) in keys], [column[s] for (n, d, s) in keys]] = \
+            solutionValues(solver, schedule.shifts.values()) == 1
+    for (n, s) in schedule.lastNights.items():
+        if n in row:
+            assigned[row[n], 0, column[s]] = True
+    return assigned
+
+def printSolution(schedule, solver):
+    """Prints the assigned shifts, the worktime and overtime of every employee, the free weekends and free days."""
+    cal = schedule.cal
+    allEmployees = schedule.employees.names
+
+    assigned = assignmentArray(schedule, solver)
+    print('Solution:')
+    for d in cal.planned:
+        print('Day %i %s' % (d, calendar.day_name[cal.weekday[d]]))
+        for (i, s) in zip(*np.nonzero(assigned[:, d])):
+            print('  Employee %s works shift %s' % (allEmployees[i], arrayShifts[s]))
+
+    workdays, worked, targetHours, newOvertime = worktimeArrays(schedule, solver)
+    print('')
+    print('Worktime in %i workdays:' % workdays)
+    for (n, minutes, hours) in zip(allEmployees, worked, targetHours):
+        print('  Employee %s works %i minutes, target %i hours' % (n, minutes, round(hours)))
 
-    filestr = "shifts-%i-%i.pdf" % (month, year)
+    print('')
+    print('New Overtime:')
+    for (n, overtime) in zip(allEmployees, newOvertime):
+        print('  Employee %s has now a overtime of %d hours' % (n, overtime))
 
-    pp = PdfPages(filestr)
-    
-    fig, ax =plt.subplots(figsize=(12,4))
-
-    #color weekends
-    colors = []
-    for e in list(all_days):
-        date = datetime.date(year, month, e)
-        weekday = date.weekday()
-        tmpa = []
-        if weekday == 5 or weekday == 6:
-            for a in range(1,len(allEmployees)+1):
-                tmpa.append("#42ff9a")
-            colors.append(tmpa)
-        else:
-            for a in range(1,len(allEmployees)+1):
-                tmpa.append("w")
-            colors.append(tmpa)
-
-
-
-    ax.axis('tight')
-    ax.axis('off')
-    the_table = ax.table(rowLabels=dates.strftime('%Y-%m-%d %A'), cellText=df.values,colLabels=df.columns,loc='center',cellColours=colors)
-    pp.savefig(fig, bbox_inches='tight')
-    plt.close()
-
-    fig1, ax1 =plt.subplots(figsize=(12,4))
-    ax1.axis('tight')
-    ax1.axis('off')
-    the_table1 = ax1.table(rowLabels=ind, cellText=odf.values,colLabels=odf.columns,loc='center')
-    txt = "required free days %s" % (free_days_count)
-    fig1.text(.1,.1,txt)
-    pp.savefig(fig1, bbox_inches='tight')
-    plt.close()
+    print('')
+    print('free weekends:')
+    for (var, value) in zip(schedule.all_weekends, solutionValues(solver, schedule.all_weekends)):
+        if value == 1:
+            print('  weekend free %s' % (var))
+    print('')
+    print('free days:')
+    for (var, value) in zip(schedule.all_emp_free_days, solutionValues(solver, schedule.all_emp_free_days)):
+        if value == 1:
+            print("  %s" % var)
+
+def worktimeArrays(schedule, solver):
+    """(workdays, worked minutes, target hours, new overtime hours), the arrays in employee order."""
+    results = worktimeResults(schedule, solver)
+    names = schedule.employees.names
+    worked = np.array([results[n][0] for n in names])
+    target = np.array([results[n][1] for n in names])
+    workdays = len(schedule.cal.planned) - schedule.free_days_count
+    targetHours = np.array([e.hours_per_week for e in schedule.employees]) / 5 * workdays
+    return workdays, worked, targetHours, (worked - target) / 60
+
+def worktimeTable(schedule, solver):
+    """Row labels and rows of the worktime table below the schedule."""
+    workdays, worked, targetHours, newOvertime = worktimeArrays(schedule, solver)
+    ind = ["overtime", "actual worktime", "target worktime"]
+    return ind, [newOvertime.tolist(),
+                 ["%i hours" % (minutes // 60) for minutes in worked],
+                 ["%i hours" % round(hours) for hours in targetHours]]
+
+def timeRanges(schedule, solver):
+    """Working hours of every employee on every planned day as string array
+    of shape (employees, planned days), e.g. '14:00-20:00'. A night shift
+    continues on the next day, a team meeting is marked 'TM'."""
+    cal = schedule.cal
+    planned = np.arange(cal.firstDay, cal.numDays + 1)
+
+    assigned = assignmentArray(schedule, solver)
+    day = assigned[:, planned, 0]
+    night = assigned[:, planned, 1:].any(axis=2)
+    # the night shift (if any) of the day before ends on the planned day
+    prevNight = assigned[:, planned - 1, 1:].any(axis=2)
+    prevType = cal.night[planned - 1]
+    vacation = np.array([[d in e.vacation for d in planned] for e in schedule.employees], dtype=bool).reshape(len(assigned), len(planned))
+    meeting = cal.team_meeting[planned] & ~vacation
+
+    afterNight = np.select([prevType == 'n', prevType == 'nhwk'], ['05:00-13:30', '05:00-09:00'], '06:00-13:30')
+    end = np.where(meeting, 'TM ', '')
+    end = np.char.add(end, np.where(day, np.where(prevNight, np.where(prevType == 'wn', '06:00-20:00', '05:00-20:00'), '14:00-20:00'), ''))
+    end = np.char.add(end, np.where(night, '13:00-22:00', ''))
+    end = np.char.add(end, np.where(prevNight & ~day, afterNight, ''))
+    return np.where(prevNight & night, np.where(prevType == 'wn', '06:00-22:00', '05:00-22:00'), end)
+
+def outputFile(schedule, suffix):
+    first = schedule.cal.dates[schedule.cal.firstDay]
+    return "shifts-%i-%i%s" % (first.month, first.year, suffix)
+
+def shiftPeriod(date, shift):
+    """Start and end (datetime) of a shift on date, a night shift ends on the next day."""
+    start, end = (datetime.time.fromisoformat(t) for t in shiftTimes[shift])
+    begins = datetime.datetime.combine(date, start)
+    ends = datetime.datetime.combine(date, end)
+    return begins, ends + datetime.timedelta(days=1) if shift in NIGHT_SHIFTS else ends
+
+def writePdfSchedule(solution, openFile=False):
+    """shifts-month-year.pdf, the weeks of each month and blocks of employees
+    on their own pages, then the worktime table."""
+    schedule = solution.schedule
+    filestr = outputFile(schedule, ".pdf")
+    pages = pdfroster.writePdf(filestr, schedule.cal, schedule.employees.names, timeRanges(schedule, solution.solver),
+                               worktimeTable(schedule, solution.solver), schedule.free_days_count)
+    print('%i pages written to %s' % (pages, filestr))
+    if openFile:
+        subprocess.Popen([filestr],shell=True)
+
+def writeSchedule(solution, openFile=False):
+    """shifts-month-year.csv, one row per assigned shift, to be read back by loadSchedule."""
+    filestr = outputFile(solution.schedule, ".csv")
+    with open(filestr, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["employee", "date", "shift", "start", "end"])
+        for (n, date, s) in solution.assignments:
+            writer.writerow([n, date.isoformat(), s] + [t.isoformat() for t in shiftPeriod(date, s)])
+    print('Schedule written to %s' % filestr)
+
+def writeJsonSchedule(solution, openFile=False):
+    """shifts-month-year.jsonl, one JSON object per assigned shift, to be read back by loadSchedule."""
+    filestr = outputFile(solution.schedule, ".jsonl")
+    with open(filestr, 'w') as f:
+        for (n, date, s) in solution.assignments:
+            start, end = shiftPeriod(date, s)
+            f.write(json.dumps({"employee": n, "date": date.isoformat(), "shift": s,
+                                "start": start.isoformat(), "end": end.isoformat()}) + '\n')
+    print('Schedule written to %s' % filestr)
+
+def writeCalendars(solution, openFile=False):
+    """shifts-month-year-<employee>.ics, an iCalendar file with the shifts of each employee."""
+    byEmployee = {n: [] for n in solution.schedule.employees.names}
+    for (n, date, s) in solution.assignments:
+        byEmployee[n].append((date, s))
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    for (n, shifts) in byEmployee.items():
+        name = ''.join(c if c.isalnum() else '_' for c in n)
+        filestr = outputFile(solution.schedule, "-%s.ics" % name)
+        with open(filestr, 'w', newline='') as f:
+            f.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Shift calculator %s//EN\r\n' % version)
+            for (date, s) in shifts:
+                start, end = shiftPeriod(date, s)
+                f.write('BEGIN:VEVENT\r\nUID:%s-%s-%s@shift-calculator\r\nDTSTAMP:%s\r\n'
+                        'DTSTART:%s\r\nDTEND:%s\r\nSUMMARY:Shift %s\r\nEND:VEVENT\r\n'
+                        % (name, date.isoformat(), s, stamp, start.strftime('%Y%m%dT%H%M%S'), end.strftime('%Y%m%dT%H%M%S'), s))
+            f.write('END:VCALENDAR\r\n')
+    print('Calendars written to %s' % outputFile(solution.schedule, "-<employee>.ics"))
+
+def writeRoster(solution, openFile=False):
+    """shifts-month-year.xlsx, the working hours like the PDF with one sheet
+    per month, and the worktime table. Needs openpyxl."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import PatternFill
+
+    schedule = solution.schedule
+    cal = schedule.cal
+    allEmployees = schedule.employees.names
+    ranges = timeRanges(schedule, solution.solver)
+    weekend = PatternFill('solid', fgColor='42FF9A')
+
+    wb = Workbook(write_only=True)
+    for period in cal.periods():
+        ws = wb.create_sheet(cal.dates[period.start].strftime('%B %Y'))
+        ws.append(["date"] + allEmployees)
+        for d in period:
+            row = [cal.dates[d].strftime('%Y-%m-%d %A')] + ranges[:, d - cal.firstDay].tolist()
+            if cal.weekend[d]:
+                row = [WriteOnlyCell(ws, value=v) for v in row]
+                for cell in row:
+                    cell.fill = weekend
+            ws.append(row)
+    ws = wb.create_sheet('worktime')
+    ws.append([""] + allEmployees)
+    for (label, row) in zip(*worktimeTable(schedule, solution.solver)):
+        ws.append([label] + row)
+    ws.append(["required free days %s" % schedule.free_days_count])
+    filestr = outputFile(schedule, ".xlsx")
+    wb.save(filestr)
+    print('Roster written to %s' % filestr)
+
+# output formats of render(); only pdf needs matplotlib
+writers = {'pdf': writePdfSchedule,
+           'csv': writeSchedule,
+           'json': writeJsonSchedule,
+           'ics': writeCalendars,
+           'xlsx': writeRoster}
+
+def writePool(schedule, pool, openFile=False):
+    """Writes a pool of Solutions side by side to shifts-month-year-pool.pdf and .csv."""
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    cal = schedule.cal
+    first = cal.dates[cal.firstDay]
+    prefix = "shifts-%i-%i-pool" % (first.month, first.year)
+    with open(prefix + ".csv", 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["schedule", "objective", "employee", "date", "shift"])
+        for (i, solution) in enumerate(pool):
+            writer.writerows([i + 1, solution.objective, n, date.isoformat(), s] for (n, date, s) in solution.assignments)
+
+    # one cell per day and schedule, listing who works which shift
+    cells = []
+    for solution in pool:
+        byDate = {}
+        for (n, date, s) in sorted(solution.assignments, key=lambda a: (a[1], a[2])):
+            byDate.setdefault(date, []).append('%s %s' % (s, n))
+        cells.append(byDate)
+    columns = ['%i (%i)' % (i + 1, solution.objective) for (i, solution) in enumerate(pool)]
+
+    pp = PdfPages(prefix + ".pdf")
+    for period in cal.periods():
+        fig, ax = plt.subplots(figsize=(4 * len(pool), 8))
+        ax.axis('tight')
+        ax.axis('off')
+        rows = [cal.dates[d] for d in period]
+        ax.table(rowLabels=[date.strftime('%Y-%m-%d %a') for date in rows],
+                 cellText=[[', '.join(byDate.get(date, [])) for byDate in cells] for date in rows],
+                 colLabels=columns, loc='center')
+        pp.savefig(fig, bbox_inches='tight')
+        plt.close()
     pp.close()
-    subprocess.Popen([filestr],shell=True)
-
+    print('%i schedules written to %s.pdf and %s.csv' % (len(pool), prefix, prefix))
+    if openFile:
+        subprocess.Popen([prefix + ".pdf"], shell=True)
 
+def printStatistics(solver):
     # Statistics.
     print('\nStatistics')
     print('  - conflicts      : %i' % solver.NumConflicts())
     print('  - branches       : %i' % solver.NumBranches())
     print('  - wall time      : %f s' % solver.WallTime())
     print('')
-    print("Shift calculator %s by Fabian During" % version)
-    print('')
-    print("Press enter to close")
-    input()
 
-def checkConfigs():
+class SolutionWriter(cp_model.CpSolverSolutionCallback):
+    """Writes every improving solution found by the solver.
+
+    <prefix>-solutions.jsonl gets one JSON object per solution, <prefix>-solutions.csv
+    one row per assigned shift. Both carry the objective value and the elapsed time.
+    """
+
+    def __init__(self, shifts, dates, prefix):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.shifts = shifts
+        self.dates = dates
+        self.count = 0
+        self.jsonFile = prefix + "-solutions.jsonl"
+        self.csvFile = prefix + "-solutions.csv"
+        self.json = open(self.jsonFile, 'w')
+        self.csv = open(self.csvFile, 'w', newline='')
+        self.writer = csv.writer(self.csv)
+        self.writer.writerow(["solution", "objective", "wall_time", "employee", "day", "date", "shift"])
+
+    def on_solution_callback(self):
+        self.count += 1
+        objective = self.ObjectiveValue()
+        wallTime = self.WallTime()
+        assigned = [key for (key, var) in self.shifts.items() if self.BooleanValue(var)]
+
+        json.dump({"solution": self.count, "objective": objective, "wall_time": wallTime,
+                   "shifts": [{"employee": n, "day": d, "date": self.dates[d].isoformat(), "shift": s} for (n, d, s) in assigned]}, self.json)
+        self.json.write('\n')
+        self.json.flush()
+        self.writer.writerows([self.count, objective, wallTime, n, d, self.dates[d].isoformat(), s] for (n, d, s) in assigned)
+        self.csv.flush()
+        print('  solution %i: objective %i after %.2f s' % (self.count, objective, wallTime))
+
+    def close(self):
+        self.json.close()
+        self.csv.close()
+
+def checkConfigs(interactive=True):
+    createdConfigs = writeTemplates(employeeFile, configFile)
+
+    if createdConfigs:
+        print("Template files created...")
+        print("Consider to change them!")
+        print("Shift calculator %s by Fabian During" % version)
+        if interactive:
+            print('')
+            print("Press enter to close")
+            input()
+        sys.exit()
+
+def writeTemplates(employeePath, configPath):
+    """Writes the template employee.csv and config.ini where they are missing. Returns True if one was written."""
     createdConfigs = False
-    try:
-        f = open(employeeFile)
-    except IOError:
-        with open(employeeFile, 'w', encoding='UTF8') as f:
+    if not os.path.exists(employeePath):
+        with open(employeePath, 'w', encoding='UTF8', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(["name","hours_per_week","overtime","available_for_shift","not_replaced_by","prefFree","vacation","forced_shifts"])
-            writer.writerow(["Paula",20,10,"d,wn,nhwk","James","1,2","4,5","27/d"])
-            writer.writerow(["James",30,5,"n,d,wn,nhwk","","","",""])
-            writer.writerow(["Torsten",60,15,"n,d,wn,nhwk","","","",""])
-            writer.writerow(["Thira",40,0,"n,d,wn,nhwk","","","",""])
-            writer.writerow(["Frank",40,5,"n,d,wn,nhwk","","","",""])
+            writer.writerow(["name","hours_per_week","overtime","available_for_shift","not_replaced_by","double_shift","no_single_dayshift","48_hour_shifts","can_be_single","prefFree","vacation","forced_shifts"])
+            writer.writerow(["Paula",20,10,"d,wn,nhwk","James","yes","no","no","no","1,2","4,5","27/d"])
+            writer.writerow(["James",30,5,"n,d,wn,nhwk","","yes","no","no","no","","",""])
+            writer.writerow(["Torsten",60,15,"n,d,wn,nhwk","","yes","yes","yes","no","","",""])
+            writer.writerow(["Thira",40,0,"n,d,wn,nhwk","","no","no","no","no","","",""])
+            writer.writerow(["Frank",40,5,"n,d,wn,nhwk","","yes","no","no","no","","",""])
 
         createdConfigs = True
 
     # if no global config: generate on
-    try:
-        config = configparser.ConfigParser()
-        config.sections()
-        with open(configFile) as f:
-            config.read_file(f)
-    except IOError:
+    if not os.path.exists(configPath):
         config = configparser.RawConfigParser()
         config.add_section('General')
         config.add_section('Constraints')
         config.add_section('Shift_worktimes')
         config.add_section('Other_dates')
+        config.add_section('Objective')
+        config.add_section('Solver')
         config.set('General', 'month', '3')
         config.set('General', 'year', '2022')
         config.set('General', 'country_cc', 'DE')
@@ -1016,6 +1915,12 @@ def checkConfigs():
         config.set('General', 'overtime_modifier', '0.5')
         config.set('General', 'force_pref_free', 'True')
         config.set('General', 'nightshift_last_month', 'James')
+        config.set('General', 'stream_solutions', 'False')
+        config.set('General', 'months', '1')
+        config.set('General', 'horizon_mode', 'joint')
+        config.set('General', 'overlap_days', '7')
+        config.set('General', 'previous_schedule', '')
+        config.set('General', 'minimal_change_weight', '0')
 
         config.set('Constraints', 'one_empl_per_period', 'True')
         config.set('Constraints', 'one_shift_per_day', 'True')
@@ -1036,135 +1941,106 @@ def checkConfigs():
         config.set('Shift_worktimes', 'nightShiftHoursNPlusD', '82.5')
         config.set('Shift_worktimes', 'nightShiftHoursWNPlusD', '82.5')
         config.set('Shift_worktimes', 'team_meeting_time', '24.0')
+        # empty: the hours of nightShiftHoursNPlusD/nightShiftHoursWNPlusD
+        config.set('Shift_worktimes', 'nightShiftHoursPlusDTeamMeeting', '')
+        for (k, default) in lastMonthHoursKeys.values():
+            config.set('Shift_worktimes', k, default)
 
         config.set('Other_dates', 'team_meetings', '1,2')
         config.set('Other_dates', 'no_dayshift', '1,2')
         config.set('Other_dates', 'replace_hwk_with_n', '1,2')
 
-        with open(configFile, 'w') as configfile:
-            config.write(configfile)
-        createdConfigs = True
-
-    if createdConfigs:
-        print("Template files created...")
-        print("Consider to change them!")
-        print("Shift calculator %s by Fabian During" % version)
-        print('')
-        print("Press enter to close")
-        input()
-        sys.exit()
-
-def onVacation(name, day):
-    i = workerColumns['name'].index(name)
-    availShifts = workerColumns['vacation'][i]
-    if not availShifts:
-        return False
-    avshifts = availShifts.split(',')
-    
-    return str(day) in avshifts
-
-def doesDoubleShift(name):
-    i = workerColumns['name'].index(name)
-    value = workerColumns['double_shift'][i]
-    return value == "yes"
-
-def hasPrefFree(name, day):
-    i = workerColumns['name'].index(name)
-    availShifts = workerColumns['prefFree'][i]
-    avshifts = availShifts.split(',')
-    if not avshifts:
-        return False
-    return str(day) in avshifts
-
-def doesShift(name, shift):
-    i = workerColumns['name'].index(name)
-    availShifts = workerColumns['available_for_shift'][i]
-    avshifts = availShifts.split(',')
-    return shift in avshifts
-
-def checkForcedShifts(name, day, shift):
-    g = workerColumns['name'].index(name)
-    availShifts = workerColumns['forced_shifts'][g]
-    avshifts = availShifts.split(',')
-
-    nightshifts = ["n","nhwk","wn"]
-    dayshifts = ["d"]
-    
-    if avshifts[0] != '' :
-        for i in avshifts:
-            aa = i.split("/")
-            tm = False
-            if aa[1] in nightshifts or shift == aa[1]:
-                tm = True
-            if str(day) == aa[0] and tm:
-                return True
-    return False
-
-def isLastMonthShiftN(name,day):
-
-    day = int(day)
-
-    date = datetime.date(year, month, day)
-    weekday = date.weekday()
-
-    if weekday - 1 < 0:
-        weekday = 6
-    else:
-        weekday = weekday - 1
-
-    if name == nightshift_last_month and day == 1 and (weekday == 6 or weekday == 0):
-        return True
-    return False
-
-def isLastMonthShiftHWK(name,day):
-     
-    day = int(day)
-    
-    date = datetime.date(year, month, day)
-    weekday = date.weekday()
-    
-    if weekday - 1 < 0:
-        weekday = 6
-    else:
-        weekday = weekday - 1
-
-    if name == nightshift_last_month and day == 1 and (weekday == 1 or weekday == 2 or weekday == 3):
-        return True
-    return False    
+        config.set('Objective', 'mode', 'weighted')
+        config.set('Objective', 'priority', ', '.join(objectiveTerms))
+        for (t, w) in defaultObjectiveWeights.items():
+            config.set('Objective', t, str(w))
 
-def isLastMonthShiftWN(name,day):
+        # empty: all cores of the machine the schedule is solved on
+        config.set('Solver', 'num_workers', '')
+        config.set('Solver', 'max_time_in_seconds', '300')
+        config.set('Solver', 'relative_gap_limit', '0.0')
+        config.set('Solver', 'random_seed', '1')
+        config.set('Solver', 'linearization_level', '1')
 
-    day = int(day)
-
-    date = datetime.date(year, month, day)
-    weekday = date.weekday()
+        with open(configPath, 'w') as configfile:
+            config.write(configfile)
+        createdConfigs = True
 
-    if weekday - 1 < 0:
-        weekday = 6
-    else:
-        weekday = weekday - 1
-    
-    if name == nightshift_last_month and day == 1 and (weekday == 4 or weekday == 5):
-        return True
-    return False      
-
-def shouldNotRelief(empl, next):
-    i = workerColumns['name'].index(empl)
-    relief = workerColumns['not_replaced_by'][i]
-    if relief:
-        avshifts = relief.split(',')
-        return next in avshifts
-    return False
-
-def does48hours(name):
-    i = workerColumns['name'].index(name)
-    value = workerColumns['48_hour_shifts'][i]
-    return value == "yes"
-
-def canBeSingle(name):
-    i = workerColumns['name'].index(name)
-    value = workerColumns['can_be_single'][i]
-    return value == "yes"
+    return createdConfigs
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Shift calculator %s" % version)
+    parser.add_argument('--workers', dest='num_workers', type=int, metavar='N',
+                        help='number of parallel search workers (default: all cores)')
+    parser.add_argument('--time-limit', dest='max_time_in_seconds', type=float, metavar='SECONDS',
+                        help='max wall time of the solver in seconds')
+    parser.add_argument('--gap-limit', dest='relative_gap_limit', type=float, metavar='GAP',
+                        help='stop once the relative gap to the best bound is below this value')
+    parser.add_argument('--seed', dest='random_seed', type=int, metavar='SEED',
+                        help='random seed of the solver')
+    parser.add_argument('--months', type=int, metavar='N',
+                        help='number of consecutive months to plan, starting with the configured month')
+    parser.add_argument('--rolling', action='store_true',
+                        help='plan the months one after another instead of in one model')
+    parser.add_argument('--stream', action='store_true',
+                        help='write every improving solution while solving')
+    parser.add_argument('--previous', metavar='FILE',
+                        help='warm start from a schedule written by an earlier run (shifts-month-year.csv)')
+    parser.add_argument('--min-change', dest='min_change', type=int, metavar='WEIGHT',
+                        help='cost of every shift that differs from the --previous schedule')
+    parser.add_argument('--headless', action='store_true',
+                        help='do not open the PDF and do not wait for enter at the end')
+    parser.add_argument('--batch', metavar='DIR',
+                        help='solve every scenario directory (with config.ini and employee.csv) in DIR, implies --headless')
+    parser.add_argument('--output', metavar='DIR', default='output',
+                        help='output directory of --batch (default: output)')
+    parser.add_argument('--jobs', type=int, metavar='N',
+                        help='number of scenarios --batch (or variants --what-if) solves at once (default: all cores)')
+    parser.add_argument('--pool', type=int, metavar='K',
+                        help='find K distinct schedules and render them side by side')
+    parser.add_argument('--pool-tolerance', dest='pool_tolerance', type=float, metavar='REL',
+                        help='relative objective tolerance of the --pool alternatives (default 0)')
+    parser.add_argument('--pool-distance', dest='pool_distance', type=int, metavar='N',
+                        help='min number of shifts every --pool alternative differs in (default 2)')
+    parser.add_argument('--check', action='store_true',
+                        help='only check the input and whether a schedule exists, name the conflicting rules if not')
+    parser.add_argument('--what-if', dest='what_if', metavar='FLAGS',
+                        help='solve every on/off combination of these [Constraints] flags (, separated) in one model, --jobs at once')
+    parser.add_argument('--decompose', action='store_true',
+                        help='solve the night shifts first, then the day shifts, then improve by LNS moves (large rosters)')
+    parser.add_argument('--lns', action='store_true',
+                        help='solve with half the time limit, then improve by LNS moves in the other half')
+    parser.add_argument('--moves', type=int, metavar='N',
+                        help='number of LNS moves of --lns and --decompose (default 20)')
+    parser.add_argument('--config', metavar='FILE',
+                        help='config file, .ini, .json or .yaml (default %s)' % configFile)
+    parser.add_argument('--employees', metavar='FILE',
+                        help='employee file, .csv, .json or .yaml (default %s)' % employeeFile)
+    parser.add_argument('--formats', metavar='FORMATS',
+                        help='comma separated output formats of the schedule: pdf, csv, json, ics, xlsx (default pdf,csv)')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='append phase timings, model sizes and solver statistics as JSON lines to FILE (- for stderr)')
+    parser.add_argument('--linearization-level', dest='linearization_level', type=int, metavar='LEVEL',
+                        help='linearization level of the solver (0, 1 or 2)')
+    return parser.parse_args()
+
+def readSolverParameters(config, args):
+    # [Solver] section first, command line flags override it
+    params = {'num_workers': os.cpu_count()}
+    if config.has_section('Solver'):
+        for (k, v) in config['Solver'].items():
+            if k in solverParameterTypes and v.strip():
+                params[k] = solverParameterTypes[k](v)
+    for k in solverParameterTypes:
+        if getattr(args, k) is not None:
+            params[k] = getattr(args, k)
+    return params
+
+def lastMonthShift(lastNights, name, day):
+    """Night shift type which name took over from before the horizon into day, or None."""
+    if day == 1:
+        return lastNights.get(name)
+    return None
 
 #https://stackoverflow.com/questions/52561643/how-to-step-one-week-7-days-in-a-for-loop-datetime
 def daterange(start_date, end_date):
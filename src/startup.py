@@ -0,0 +1,60 @@
+"""Checks the startup budget of scheduler.py.
+
+    python startup.py [--budget SECONDS] [--runs N]
+
+Imports scheduler in fresh interpreters and fails (exit status 1) if the
+best import time exceeds the budget or if a dependency which is only
+needed for rendering, holidays or other input formats got imported. OR-Tools
+itself (which brings pandas along) is part of the budget.
+
+The repository has no test suite; this script is the startup test, its
+exit status can gate a CI job like benchmark.py and worktimecheck.py.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# imported where they are needed, never by import scheduler
+lazyModules = ['matplotlib', 'holidays', 'openpyxl', 'yaml']
+
+probe = '''
+import json, sys, time
+started = time.perf_counter()
+import scheduler
+print(json.dumps({"seconds": time.perf_counter() - started,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+''' % lazyModules
+
+
+def measure():
+    """(seconds, lazy modules loaded) of one import scheduler in a fresh interpreter."""
+    output = subprocess.run([sys.executable, '-c', probe], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.splitlines()[-1])
+    return result['seconds'], result['loaded']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=1.0, metavar='SECONDS')
+    parser.add_argument('--runs', type=int, default=3, metavar='N')
+    args = parser.parse_args()
+
+    runs = [measure() for i in range(args.runs)]
+    best = min(seconds for (seconds, loaded) in runs)
+    loaded = sorted({m for (seconds, modules) in runs for m in modules})
+    print('import scheduler: %.3f s (best of %i), budget %.3f s' % (best, args.runs, args.budget))
+    failed = False
+    if loaded:
+        print('FAIL: import scheduler loads %s' % ', '.join(loaded))
+        failed = True
+    if best > args.budget:
+        print('FAIL: over budget')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
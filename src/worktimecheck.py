@@ -0,0 +1,155 @@
+"""Checks the worktime sums of the model against a shift by shift count.
+
+    python worktimecheck.py [--config FILE --employees FILE] [--months N] [--seeds N] [--time-limit SECONDS]
+
+Solves the roster (default: the template of scheduler.py) once per seed
+and recounts the worktime of every employee from the assigned shifts:
+vacation days, the night shift carried into the horizon, team meetings,
+day and night shifts, and a night followed by a day shift as one double
+shift. Then solves it with a double shift forced onto an added team meeting
+day, once with the hours of the other double shifts and once with
+nightShiftHoursPlusDTeamMeeting. Exits with status 1 if a count differs
+from the model's sum.
+
+The repository has no test suite; this script is the worktime test, its
+exit status can gate a CI job like startup.py.
+"""
+import argparse
+import configparser
+import contextlib
+import os
+import sys
+import tempfile
+
+import scheduler
+from employees import EmployeeTable
+
+
+def countWorktimes(config, schedule, solver):
+    """Worked minutes of every employee, counted from the solved shifts."""
+    section = config["Shift_worktimes"]
+
+    def minutes(key, default=None):
+        return int(float(section.get(key, default) if default else section[key]) * 60)
+
+    day = minutes('dayShiftHours')
+    night = {'n': minutes('nightShiftHoursN'), 'nhwk': minutes('nightShiftHoursHWK'), 'wn': minutes('nightShiftHoursWeekend')}
+    double = {'n': minutes('nightShiftHoursNPlusD'), 'nhwk': minutes('nightShiftHoursNPlusD'), 'wn': minutes('nightShiftHoursWNPlusD')}
+    doubleOnMeeting = None
+    if section.get('nightShiftHoursPlusDTeamMeeting', '').strip():
+        doubleOnMeeting = minutes('nightShiftHoursPlusDTeamMeeting')
+    meeting = minutes('team_meeting_time')
+    lastMonth = {s: minutes(k, default) for (s, (k, default)) in scheduler.lastMonthHoursKeys.items()}
+
+    cal = schedule.cal
+    values = scheduler.solutionValues(solver, schedule.shifts.values())
+    worked = {key for (key, value) in zip(schedule.shifts, values) if value == 1}
+    counts = {}
+    for e in schedule.employees:
+        n = e.name
+        total = sum(int(e.hours_per_week / 5 * 60) for d in e.vacation if d in cal.planned and not cal.weekend[d])
+
+        prev = cal.firstDay - 1
+        if prev == 0:
+            if n in schedule.lastNights:
+                total += lastMonth[schedule.lastNights[n]]
+        elif (n, prev, str(cal.night[prev])) in worked:
+            total += lastMonth[str(cal.night[prev])]
+
+        doubled = set()
+        for d in cal.planned:
+            nightBefore = str(cal.night[d - 1])
+            if cal.team_meeting[d] and d not in e.vacation:
+                # 'n' and 'wn' end at 13:30, within the meeting
+                total += meeting - 30 if (n, d - 1, nightBefore) in worked and nightBefore != 'nhwk' else meeting
+            s = str(cal.night[d])
+            if (n, d, s) in worked and (n, d + 1, 'd') in worked:
+                total += doubleOnMeeting if cal.team_meeting[d + 1] and doubleOnMeeting is not None else double[s]
+                doubled.add(d + 1)
+            elif (n, d, s) in worked:
+                total += night[s]
+            if (n, d, 'd') in worked and d not in doubled:
+                total += day
+        counts[n] = total
+    return counts
+
+
+def forceMeetingDouble(schedule):
+    """Forces a night shift followed by a day shift on the first team meeting
+    day where an employee with double shifts can take both. Returns the
+    (name, meeting day) or None."""
+    cal = schedule.cal
+    shifts = schedule.shifts
+    for d in cal.planned:
+        if not cal.team_meeting[d] or d - 1 not in cal.planned:
+            continue
+        for e in schedule.employees:
+            night = (e.name, d - 1, str(cal.night[d - 1]))
+            if e.double_shift and night in shifts and (e.name, d, 'd') in shifts:
+                schedule.model.Add(shifts[night] == 1)
+                schedule.model.Add(shifts[(e.name, d, 'd')] == 1)
+                return e.name, d
+    return None
+
+
+def check(name, config, employees, months, params, forceDouble=False):
+    """Solves config and compares the worktimes, returns the number of differences."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        schedule = scheduler.buildModel(config, employees, months)
+        forced = forceMeetingDouble(schedule) if forceDouble else None
+        solution = scheduler.solve(schedule, params)
+    if forceDouble and forced is None:
+        print('%s: no team meeting day for a double shift' % name)
+        return 1
+    if not solution.feasible:
+        print('%s: no schedule (%s)' % (name, solution.statusName))
+        return 1 if forceDouble else 0
+    model = scheduler.worktimeResults(schedule, solution.solver)
+    counted = countWorktimes(config, schedule, solution.solver)
+    mismatches = 0
+    for n in schedule.employees.names:
+        if model[n][0] != counted[n]:
+            print('%s: %s works %i minutes in the model, %i counted' % (name, n, model[n][0], counted[n]))
+            mismatches += 1
+    print('%s: %i employees checked%s' % (name, len(counted), ', double shift of %s ending on day %i' % forced if forced else ''))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', metavar='FILE')
+    parser.add_argument('--employees', metavar='FILE')
+    parser.add_argument('--months', type=int, default=1, metavar='N')
+    parser.add_argument('--seeds', type=int, default=3, metavar='N')
+    parser.add_argument('--time-limit', type=float, default=10.0, metavar='SECONDS')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configPath = args.config or os.path.join(tmp, scheduler.configFile)
+        employeePath = args.employees or os.path.join(tmp, scheduler.employeeFile)
+        scheduler.writeTemplates(employeePath, configPath)
+        config = scheduler.loadConfig(configPath)
+        employees = EmployeeTable.load(employeePath, scheduler.configuredMonth(config))
+    config['Constraints']['respect_worktime'] = 'True'
+
+    mismatches = 0
+    for seed in range(1, args.seeds + 1):
+        params = {'max_time_in_seconds': args.time_limit, 'num_workers': 1, 'random_seed': seed}
+        mismatches += check('seed %i' % seed, config, employees, args.months, params)
+
+    # an added team meeting in the middle of the month, a weekday with day shifts in the template
+    meetings = configparser.ConfigParser()
+    meetings.read_dict(config)
+    meetings['Other_dates']['team_meetings'] += ', 15'
+    params = {'max_time_in_seconds': args.time_limit, 'num_workers': 1, 'random_seed': 1}
+    for hours in ['', '60.0']:
+        meetings['Shift_worktimes']['nightShiftHoursPlusDTeamMeeting'] = hours
+        mismatches += check('meeting day, nightShiftHoursPlusDTeamMeeting = %s' % (hours or 'empty'),
+                            meetings, employees, args.months, params, forceDouble=True)
+    if mismatches:
+        print('FAIL: %i worktimes differ' % mismatches)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()